@@ -0,0 +1,61 @@
+"""Benchmarks of the downsampling of label images.
+
+Run with, e.g.:
+
+    asv run --python=same --bench benchmark_lazy_image
+"""
+
+import itk
+import numpy as np
+
+from itkwidgets._lazy_image import LazyImage
+
+# Size limit of the rendered label image
+SIZE_LIMIT = 192
+
+
+def _label_volume(size):
+    """Thin, nested shells of labels and one voxel thick lines on a
+    background."""
+    coordinates = np.linspace(-1.0, 1.0, size, dtype=np.float32)
+    y = coordinates[:, np.newaxis]
+    x = coordinates[np.newaxis, :]
+    labels = np.empty((size, size, size), dtype=np.uint8)
+    for index, z in enumerate(coordinates):
+        shells = np.sqrt(x * x + y * y + z * z) * 8
+        labels[index] = np.where(shells % 1.0 < 0.05, shells + 1, 0)
+    for offset in range(1, 8):
+        labels[:, offset * size // 8, offset * size // 8] = 10 + offset
+    return labels
+
+
+class LabelDownsampling(object):
+    params = ([512, 1024],
+              ['shrink', 'mode'])
+    param_names = ['size', 'method']
+    timeout = 600
+
+    def setup(self, size, method):
+        self.image = itk.image_view_from_array(_label_volume(size))
+        self.factors = [int(np.ceil(size / float(SIZE_LIMIT))), ] * 3
+        self.region = self.image.GetLargestPossibleRegion()
+
+    def _downsample(self, method):
+        if method == 'shrink':
+            shrinker = itk.ShrinkImageFilter.New(self.image)
+            shrinker.SetShrinkFactors(self.factors)
+            shrinker.UpdateLargestPossibleRegion()
+            return shrinker.GetOutput()
+        labels = LazyImage(itk.array_view_from_image(self.image))
+        return labels.extract(self.region, self.factors, label=True)
+
+    def time_downsample(self, size, method):
+        self._downsample(method)
+
+    def peakmem_downsample(self, size, method):
+        self._downsample(method)
+
+    def track_visible_labels(self, size, method):
+        downsampled = itk.array_view_from_image(self._downsample(method))
+        return len(np.unique(downsampled))
+    track_visible_labels.unit = 'labels'
@@ -0,0 +1,195 @@
+"""Benchmarks of the serialization of images and geometries.
+
+Run with, e.g.:
+
+    asv run --python=same --bench benchmark_trait_types
+"""
+
+import time
+
+import itk
+import numpy as np
+
+from itkwidgets import _compression
+from itkwidgets import trait_types
+from itkwidgets._transform_types import to_point_set
+
+# Largest number of bytes of an image in the benchmarks
+MAX_IMAGE_BYTES = 1024 * 1024 * 1024
+
+# Largest number of points of a geometry list in the benchmarks
+MAX_POINTS = 10 * 1000 * 1000
+
+_vector_image_types = {
+    'uint8': itk.Image[itk.RGBPixel[itk.UC], 3],
+    'float32': itk.Image[itk.Vector[itk.F, 3], 3],
+}
+
+
+def _smooth_volume(size, dtype, components):
+    """A smooth volume with noise, which compresses like scientific data."""
+    random = np.random.RandomState(0)
+    coordinates = np.linspace(-1.0, 1.0, size, dtype=np.float32)
+    z = coordinates[:, np.newaxis, np.newaxis]
+    y = coordinates[np.newaxis, :, np.newaxis]
+    x = coordinates[np.newaxis, np.newaxis, :]
+    volume = np.exp(-4.0 * (x * x + y * y + z * z))
+    volume = volume + 0.01 * random.standard_normal(volume.shape)
+    if np.issubdtype(np.dtype(dtype), np.integer):
+        volume = volume * np.iinfo(dtype).max * 0.9
+    volume = volume.astype(dtype)
+    if components > 1:
+        volume = np.repeat(volume[..., np.newaxis], components, axis=-1)
+    return volume
+
+
+def _image(size, dtype, components):
+    if size ** 3 * components * np.dtype(dtype).itemsize > MAX_IMAGE_BYTES:
+        raise NotImplementedError('Image is larger than MAX_IMAGE_BYTES')
+    array = _smooth_volume(size, dtype, components)
+    if components == 1:
+        return itk.image_view_from_array(array)
+    if dtype not in _vector_image_types:
+        raise NotImplementedError('Pixel type is not wrapped')
+    return itk.image_view_from_array(array,
+                                     ttype=_vector_image_types[dtype])
+
+
+def _triangle_mesh(number_of_points, offset=0.0):
+    """A vtk.js PolyData triangulated height field."""
+    side = max(int(np.sqrt(number_of_points)), 2)
+    coordinates = np.linspace(0.0, 1.0, side, dtype=np.float32)
+    x, y = np.meshgrid(coordinates, coordinates)
+    z = np.sin(4.0 * x) * np.cos(4.0 * y) + offset
+    points = np.stack((x, y, z), axis=-1).astype(np.float32).reshape(-1, 3)
+    corners = np.arange(side * side, dtype=np.uint32).reshape(side, side)
+    lower = corners[:-1, :-1].ravel()
+    right = corners[:-1, 1:].ravel()
+    upper = corners[1:, :-1].ravel()
+    diagonal = corners[1:, 1:].ravel()
+    counts = np.full(lower.shape, 3, dtype=np.uint32)
+    polys = np.concatenate(
+        (np.stack((counts, lower, right, diagonal), axis=-1),
+         np.stack((counts, lower, diagonal, upper), axis=-1))).ravel()
+    return {'vtkClass': 'vtkPolyData',
+            'points': {'vtkClass': 'vtkPoints',
+                       'numberOfComponents': 3,
+                       'dataType': 'Float32Array',
+                       'size': points.size,
+                       'values': points},
+            'polys': {'vtkClass': 'vtkCellArray',
+                      'numberOfComponents': 1,
+                      'dataType': 'Uint32Array',
+                      'size': polys.size,
+                      'values': polys}}
+
+
+def _polydata_list(kind, count, number_of_points):
+    if count * number_of_points > MAX_POINTS:
+        raise NotImplementedError('Geometry list is larger than MAX_POINTS')
+    if kind == 'point_sets':
+        random = np.random.RandomState(0)
+        return [to_point_set(random.standard_normal((number_of_points, 3)))
+                for index in range(count)]
+    return [_triangle_mesh(number_of_points, index) for index in range(count)]
+
+
+class _CompactCells(object):
+    # Serialize geometries as a Viewer does
+    compact_cells = True
+
+
+class ImageSerialization(object):
+    params = ([64, 128, 256, 512],
+              ['uint8', 'uint16', 'float32'],
+              [1, 3])
+    param_names = ['size', 'dtype', 'components']
+    timeout = 600
+
+    def setup(self, size, dtype, components):
+        self.image = _image(size, dtype, components)
+        self.nbytes = self.image.GetBufferedRegion().GetNumberOfPixels() * \
+            components * np.dtype(dtype).itemsize
+        _compression.image_payload_cache.clear()
+        self.json = trait_types.itkimage_to_json(self.image)
+        _compression.image_payload_cache.clear()
+
+    def time_itkimage_to_json(self, size, dtype, components):
+        _compression.image_payload_cache.clear()
+        trait_types.itkimage_to_json(self.image)
+
+    def time_itkimage_from_json(self, size, dtype, components):
+        trait_types.itkimage_from_json(self.json)
+
+    def peakmem_itkimage_to_json(self, size, dtype, components):
+        _compression.image_payload_cache.clear()
+        trait_types.itkimage_to_json(self.image)
+
+    def peakmem_itkimage_from_json(self, size, dtype, components):
+        trait_types.itkimage_from_json(self.json)
+
+    def track_itkimage_to_json_throughput(self, size, dtype, components):
+        _compression.image_payload_cache.clear()
+        start = time.perf_counter()
+        trait_types.itkimage_to_json(self.image)
+        duration = time.perf_counter() - start
+        return self.nbytes / duration / 1e6
+    track_itkimage_to_json_throughput.unit = 'MB/s'
+
+    def track_itkimage_from_json_throughput(self, size, dtype, components):
+        start = time.perf_counter()
+        trait_types.itkimage_from_json(self.json)
+        duration = time.perf_counter() - start
+        return self.nbytes / duration / 1e6
+    track_itkimage_from_json_throughput.unit = 'MB/s'
+
+    def track_compression_ratio(self, size, dtype, components):
+        compressed = _compression.compressed_size(self.json['compressedData'])
+        return self.nbytes / float(compressed)
+    track_compression_ratio.unit = 'ratio'
+
+
+class PolyDataListSerialization(object):
+    params = (['point_sets', 'geometries'],
+              [1, 100, 1000],
+              [1000, 100000, 1000000])
+    param_names = ['kind', 'count', 'points']
+    timeout = 600
+
+    def setup(self, kind, count, points):
+        self.polydata_list = _polydata_list(kind, count, points)
+        self.manager = _CompactCells()
+        self.nbytes = sum(memoryview(buffer).nbytes for buffer in
+                          trait_types.polydata_list_buffers(
+                              self.polydata_list))
+        self.json = trait_types.polydata_list_to_json(self.polydata_list,
+                                                      self.manager)
+
+    def time_polydata_list_to_json(self, kind, count, points):
+        trait_types.polydata_list_to_json(self.polydata_list, self.manager)
+
+    def time_polydata_list_from_json(self, kind, count, points):
+        trait_types.polydata_list_from_json(self.json, self.manager)
+
+    def peakmem_polydata_list_to_json(self, kind, count, points):
+        trait_types.polydata_list_to_json(self.polydata_list, self.manager)
+
+    def peakmem_polydata_list_from_json(self, kind, count, points):
+        trait_types.polydata_list_from_json(self.json, self.manager)
+
+    def track_polydata_list_to_json_throughput(self, kind, count, points):
+        start = time.perf_counter()
+        trait_types.polydata_list_to_json(self.polydata_list, self.manager)
+        duration = time.perf_counter() - start
+        return self.nbytes / duration / 1e6
+    track_polydata_list_to_json_throughput.unit = 'MB/s'
+
+    def track_compression_ratio(self, kind, count, points):
+        compressed = 0
+        for polydata in self.json:
+            for key in ('points', 'verts', 'polys'):
+                if key in polydata:
+                    compressed += _compression.compressed_size(
+                        polydata[key]['compressedValues'])
+        return self.nbytes / float(compressed)
+    track_compression_ratio.unit = 'ratio'
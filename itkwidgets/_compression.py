@@ -0,0 +1,594 @@
+"""Compression of pixel and geometry buffers sent to the browser.
+
+Large buffers are split into independent zstd frames that are compressed
+concurrently on a shared thread pool. zstandard releases the GIL while
+compressing, and the frames can also be decompressed in parallel by the
+JavaScript WorkerPool.
+
+Buffers of multi-byte elements can optionally be shuffled before compression
+so that bytes, or bits, of equal significance are stored together. This
+exposes the redundancy of smooth scientific data to zstd.
+"""
+
+import os
+import time
+import threading
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import zstandard as zstd
+except ImportError:
+    import zstd
+
+# Shuffle modes
+SHUFFLE_MODES = ('none', 'byte', 'bit')
+
+# Buffers larger than this number of bytes are split into chunks of this
+# size, and each chunk is compressed as an independent frame.
+CHUNK_SIZE = 4 * 1024 * 1024
+
+DEFAULT_LEVEL = 3
+
+# Candidate levels for adaptive level selection
+ADAPTIVE_LEVELS = (1, 3, 6, 9)
+
+# Number of bytes sampled to estimate the compression ratio and throughput
+SAMPLE_SIZE = 1024 * 1024
+
+# Number of payloads of a type and size whose level is selected with the same
+# estimates before they are measured again
+ESTIMATE_REUSE = 32
+
+# Number of sent payloads whose statistics the browser has not reported yet
+PENDING_PAYLOADS = 32
+
+# Size of the dictionaries trained for collections of small buffers
+DICTIONARY_SIZE = 64 * 1024
+
+# Minimum number of buffers to train a dictionary on
+DICTIONARY_MIN_SAMPLES = 16
+
+# Only the leading bytes of larger buffers are used as training samples
+DICTIONARY_SAMPLE_SIZE = 128 * 1024
+
+# Maximum number of compressed bytes held by the payload cache
+PAYLOAD_CACHE_SIZE = 256 * 1024 * 1024
+
+_thread_local = threading.local()
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Return the thread pool shared by the compression routines."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            cores = os.cpu_count() or 4
+            _executor = ThreadPoolExecutor(max_workers=cores)
+    return _executor
+
+
+def _compressor(level, dictionary=None):
+    """Return the compression context for this thread, level, and dictionary.
+
+    Contexts are reused across calls to avoid re-allocating zstd's working
+    memory for every buffer."""
+    compressors = getattr(_thread_local, 'compressors', None)
+    if compressors is None:
+        compressors = dict()
+        _thread_local.compressors = compressors
+    key = (level, None if dictionary is None else dictionary.dict_id())
+    if key not in compressors:
+        if dictionary is None:
+            compressors[key] = zstd.ZstdCompressor(level=level)
+        else:
+            compressors[key] = zstd.ZstdCompressor(level=level,
+                                                   dict_data=dictionary)
+    return compressors[key]
+
+
+def train_dictionary(buffers, dict_size=DICTIONARY_SIZE):
+    """Train a zstd dictionary on a collection of buffers.
+
+    Compressing small buffers against a dictionary trained on similar
+    content avoids most of the per-frame overhead. Returns a
+    zstd.ZstdCompressionDict, or None if there are too few samples."""
+    samples = [_as_bytes(buffer)[:DICTIONARY_SAMPLE_SIZE].tobytes()
+               for buffer in buffers]
+    samples = [sample for sample in samples if sample]
+    if len(samples) < DICTIONARY_MIN_SAMPLES:
+        return None
+    try:
+        return zstd.train_dictionary(dict_size, samples)
+    except zstd.ZstdError:
+        return None
+
+
+def shuffle_buffer(data, itemsize, mode='byte'):
+    """Group the bytes, or the bits, of a buffer's elements by significance.
+
+    With mode 'byte', the first byte of every itemsize-byte element is
+    stored first, followed by the second byte of every element, etc. With
+    mode 'bit', every bit of the elements is stored in its own plane; the
+    trailing elements that do not fill a byte of every plane are appended
+    unchanged. The result has the size of the input.
+    """
+    elements = np.frombuffer(data, dtype=np.uint8).reshape(-1, itemsize)
+    if mode == 'byte':
+        return np.ascontiguousarray(elements.T).reshape(-1)
+    if mode != 'bit':
+        raise ValueError('Unexpected shuffle mode: ' + str(mode))
+    count = elements.shape[0] - elements.shape[0] % 8
+    planes = np.packbits(np.unpackbits(elements[:count], axis=1).T, axis=1)
+    return np.concatenate((planes.reshape(-1), elements[count:].reshape(-1)))
+
+
+def unshuffle_buffer(data, itemsize, mode='byte'):
+    """Inverse of shuffle_buffer."""
+    shuffled = np.frombuffer(data, dtype=np.uint8)
+    number_of_elements = shuffled.size // itemsize
+    if mode == 'byte':
+        return np.ascontiguousarray(
+            shuffled.reshape(itemsize, number_of_elements).T).reshape(-1)
+    if mode != 'bit':
+        raise ValueError('Unexpected shuffle mode: ' + str(mode))
+    count = number_of_elements - number_of_elements % 8
+    planes = shuffled[:count * itemsize].reshape(itemsize * 8, count // 8)
+    elements = np.packbits(np.unpackbits(planes, axis=1).T, axis=1)
+    return np.concatenate((elements.reshape(-1),
+                           shuffled[count * itemsize:]))
+
+
+def _compress_chunk(chunk, level, shuffle='none', itemsize=1,
+                    dictionary=None):
+    if shuffle != 'none':
+        chunk = shuffle_buffer(chunk, itemsize, shuffle)
+    return _compressor(level, dictionary).compress(chunk)
+
+
+def compress_frame(data, level=DEFAULT_LEVEL, shuffle='none', itemsize=1,
+                   dictionary=None):
+    """Compress a buffer into a single zstd frame.
+
+    If level is None, the buffer is passed through uncompressed and is not
+    shuffled. If a dictionary is given, the frame can only be decompressed
+    with the same dictionary."""
+    buffer = _as_bytes(data)
+    if level is None:
+        return buffer
+    return memoryview(_compress_chunk(buffer, level, shuffle, itemsize,
+                                      dictionary))
+
+
+def _as_bytes(data):
+    """A flat, byte-format memoryview of a C-contiguous buffer."""
+    view = memoryview(data)
+    if view.ndim == 1 and view.format == 'B':
+        return view
+    return view.cast('B')
+
+
+def compress(data, level=DEFAULT_LEVEL, chunk_size=None, shuffle='none',
+             itemsize=1):
+    """Compress a buffer into one or more zstd frames.
+
+    Parameters
+    ----------
+
+    data: bytes-like, required
+        C-contiguous buffer to compress, e.g. numpy.ndarray.data.
+
+    level: int, optional
+        zstd compression level.
+
+    chunk_size: int, optional
+        Number of uncompressed bytes per frame. Defaults to CHUNK_SIZE. Must
+        be a multiple of itemsize.
+
+    shuffle: 'none', 'byte', or 'bit', optional
+        Shuffle every chunk with shuffle_buffer before it is compressed.
+
+    itemsize: int, optional
+        Number of bytes per element for the shuffle.
+
+    Returns
+    -------
+
+    A memoryview of a single frame if the buffer fits into one chunk.
+    Otherwise, a list of memoryviews with one frame per chunk. Every chunk but
+    the last holds chunk_size uncompressed bytes. If level is None, the
+    buffer is passed through uncompressed as a single view.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    buffer = _as_bytes(data)
+    number_of_bytes = buffer.nbytes
+    if level is None or number_of_bytes <= chunk_size:
+        return compress_frame(buffer, level, shuffle, itemsize)
+
+    chunks = [buffer[offset:offset + chunk_size]
+              for offset in range(0, number_of_bytes, chunk_size)]
+    executor = get_executor()
+    frames = executor.map(_compress_chunk, chunks, [level] * len(chunks),
+                          [shuffle] * len(chunks), [itemsize] * len(chunks))
+    return [memoryview(frame) for frame in frames]
+
+
+def compress_many(buffers, level=DEFAULT_LEVEL, chunk_size=None,
+                  dictionary=None):
+    """Compress several buffers concurrently.
+
+    The chunks of all the buffers are compressed as a single batch on the
+    shared thread pool, so many small buffers keep all the workers busy as
+    well as a few large ones.
+
+    Returns a list with the output of compress for every buffer, in the order
+    of the buffers. If level is None, the buffers are passed through
+    uncompressed.
+    """
+    if chunk_size is None:
+        chunk_size = CHUNK_SIZE
+    views = [_as_bytes(buffer) for buffer in buffers]
+    if level is None:
+        return views
+
+    chunks = []
+    chunk_counts = []
+    for view in views:
+        view_chunks = [view[offset:offset + chunk_size]
+                       for offset in range(0, view.nbytes, chunk_size)]
+        if not view_chunks:
+            view_chunks = [view]
+        chunks.extend(view_chunks)
+        chunk_counts.append(len(view_chunks))
+
+    count = len(chunks)
+    if count == 1:
+        frames = [_compress_chunk(chunks[0], level, dictionary=dictionary)]
+    else:
+        frames = get_executor().map(_compress_chunk, chunks, [level] * count,
+                                    ['none'] * count, [1] * count,
+                                    [dictionary] * count)
+    frames = [memoryview(frame) for frame in frames]
+
+    result = []
+    index = 0
+    for chunk_count in chunk_counts:
+        if chunk_count == 1:
+            result.append(frames[index])
+        else:
+            result.append(frames[index:index + chunk_count])
+        index += chunk_count
+    return result
+
+
+def compressed_size(compressed):
+    """Number of bytes in the output of compress."""
+    if isinstance(compressed, (list, tuple)):
+        return sum(memoryview(frame).nbytes for frame in compressed)
+    return memoryview(compressed).nbytes
+
+
+def _decompressor(dictionary=None):
+    """Return the decompression context for this thread and dictionary."""
+    decompressors = getattr(_thread_local, 'decompressors', None)
+    if decompressors is None:
+        decompressors = dict()
+        _thread_local.decompressors = decompressors
+    key = None if dictionary is None else dictionary.dict_id()
+    if key not in decompressors:
+        if dictionary is None:
+            decompressors[key] = zstd.ZstdDecompressor()
+        else:
+            decompressors[key] = zstd.ZstdDecompressor(dict_data=dictionary)
+    return decompressors[key]
+
+
+def _as_writable_bytes(output):
+    """A flat uint8 numpy view of a writable, C-contiguous buffer."""
+    if isinstance(output, np.ndarray):
+        return output.reshape(-1).view(np.uint8)
+    return np.frombuffer(output, dtype=np.uint8)
+
+
+def decompress_into(compressed, output, chunk_size=None, compression='zstd',
+                    shuffle='none', itemsize=1, dictionary=None):
+    """Decompress the output of compress into a preallocated buffer.
+
+    The frames are decompressed concurrently, each directly into its slice of
+    the output, without intermediate copies unless they are shuffled.
+
+    Parameters
+    ----------
+
+    compressed: bytes-like or list of bytes-like, required
+        A single zstd frame, or a list of frames, one per chunk.
+
+    output: writable bytes-like, required
+        C-contiguous buffer, e.g. a numpy.ndarray view of an itk.Image, that
+        receives all the uncompressed bytes.
+
+    chunk_size: int, optional
+        Number of uncompressed bytes per frame when compressed is a list.
+
+    compression: 'zstd' or 'raw', optional
+        'raw' if the buffer was passed through uncompressed.
+
+    shuffle: 'none', 'byte', or 'bit', optional
+        Shuffle mode the frames were compressed with.
+
+    itemsize: int, optional
+        Number of bytes per element for the shuffle.
+
+    dictionary: zstd.ZstdCompressionDict, optional
+        Dictionary the frames were compressed against.
+    """
+    output = _as_writable_bytes(output)
+    number_of_bytes = output.nbytes
+    if compression == 'raw':
+        output[:] = np.frombuffer(compressed, dtype=np.uint8)
+        return
+    if isinstance(compressed, (list, tuple)):
+        frames = compressed
+        if chunk_size is None:
+            chunk_size = CHUNK_SIZE
+    else:
+        frames = [compressed]
+        chunk_size = number_of_bytes
+
+    def decompress_frame(index):
+        offset = index * chunk_size
+        target = output[offset:offset + min(chunk_size,
+                                            number_of_bytes - offset)]
+        decompressor = _decompressor(dictionary)
+        if shuffle != 'none':
+            target[:] = unshuffle_buffer(
+                decompressor.decompress(frames[index], target.nbytes),
+                itemsize, shuffle)
+            return
+        reader = decompressor.stream_reader(frames[index])
+        position = 0
+        while position < target.nbytes:
+            read = reader.readinto(target[position:])
+            if read == 0:
+                raise ValueError('Compressed frame {0} is truncated'.format(
+                    index))
+            position += read
+
+    if len(frames) == 1:
+        decompress_frame(0)
+    else:
+        list(get_executor().map(decompress_frame, range(len(frames))))
+
+
+def decompress(compressed, number_of_bytes, chunk_size=None,
+               compression='zstd', shuffle='none', itemsize=1,
+               dictionary=None):
+    """Decompress the output of compress into a new bytearray.
+
+    See decompress_into for the parameters. If the buffer was passed through
+    uncompressed, it is returned as is."""
+    if compression == 'raw':
+        return compressed
+    result = bytearray(number_of_bytes)
+    decompress_into(compressed, result, chunk_size, compression, shuffle,
+                    itemsize, dictionary)
+    return result
+
+
+def _sample(buffers, sample_size=SAMPLE_SIZE, pieces=16):
+    """Evenly spaced pieces of the concatenated buffers."""
+    views = [_as_bytes(buffer) for buffer in buffers]
+    total = sum(view.nbytes for view in views)
+    if total <= sample_size:
+        return b''.join(views)
+    piece_size = sample_size // pieces
+    stride = total // pieces
+    sample = []
+    view_offset = 0
+    position = 0
+    for view in views:
+        while position < view_offset + view.nbytes:
+            start = position - view_offset
+            sample.append(view[start:start + piece_size])
+            position += stride
+        view_offset += view.nbytes
+    return b''.join(sample)
+
+
+class AdaptiveLevel(object):
+    """Select the compression level with the lowest end-to-end latency.
+
+    The latency of a transfer is estimated as the time to compress the
+    buffers in the kernel, plus the time to send the compressed bytes, plus
+    the time to decompress them in the browser. Compression ratio and
+    throughput are measured on a sample of the buffers for every candidate
+    level, and reused for the next payloads with the same element type and
+    order of magnitude of size. The bandwidth and the browser decompression
+    throughput are estimated from the statistics that the browser reports
+    after it receives a payload, which are paired with the payload by its
+    sequence number.
+    """
+
+    # Weight of a new measurement in the moving averages
+    smoothing = 0.5
+
+    def __init__(self, levels=ADAPTIVE_LEVELS):
+        self.levels = levels
+        # Bytes per second from the kernel to the browser
+        self.bandwidth = None
+        # Uncompressed bytes per second decompressed in the browser
+        self.decompression_throughput = None
+        # Compression ratio and seconds per byte of each level, with the
+        # number of payloads they were used for, by element type and size
+        self._estimates = dict()
+        self._sequence = 0
+        self._sent = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def _update(self, name, value):
+        previous = getattr(self, name)
+        if previous is not None:
+            value = (1.0 - self.smoothing) * previous + self.smoothing * value
+        setattr(self, name, value)
+
+    def select(self, buffers):
+        """Return the level for the buffers, or None to send them raw."""
+        number_of_bytes = sum(_as_bytes(buffer).nbytes for buffer in buffers)
+        if self.bandwidth is None or number_of_bytes < SAMPLE_SIZE:
+            return DEFAULT_LEVEL
+
+        workers = max(1, min(os.cpu_count() or 4,
+                             number_of_bytes // CHUNK_SIZE))
+        decompression_time = 0.0
+        if self.decompression_throughput:
+            decompression_time = number_of_bytes / self.decompression_throughput
+
+        best_level = None
+        best_latency = number_of_bytes / self.bandwidth
+        for level, (ratio, seconds_per_byte) in \
+                self._level_estimates(buffers, number_of_bytes):
+            compression_time = number_of_bytes * seconds_per_byte / workers
+            transfer_time = number_of_bytes * ratio / self.bandwidth
+            latency = compression_time + transfer_time + decompression_time
+            if latency < best_latency:
+                best_level = level
+                best_latency = latency
+        return best_level
+
+    def _level_estimates(self, buffers, number_of_bytes):
+        """The (level, (ratio, seconds per byte)) estimates of the candidate
+        levels for the buffers."""
+        key = (memoryview(buffers[0]).format, number_of_bytes.bit_length())
+        with self._lock:
+            entry = self._estimates.get(key)
+            if entry is not None and entry[0] < ESTIMATE_REUSE:
+                self._estimates[key] = (entry[0] + 1, entry[1])
+                return entry[1]
+        sample = _sample(buffers)
+        estimates = []
+        for level in self.levels:
+            start = time.perf_counter()
+            compressed = _compressor(level).compress(sample)
+            duration = max(time.perf_counter() - start, 1e-6)
+            estimates.append((level, (len(compressed) / float(len(sample)),
+                                      duration / len(sample))))
+        with self._lock:
+            self._estimates[key] = (1, estimates)
+        return estimates
+
+    def record_sent(self, compressed_bytes):
+        """Record the time a payload of compressed_bytes was serialized.
+
+        Returns the sequence number of the payload, which the browser reports
+        with its statistics."""
+        with self._lock:
+            self._sequence += 1
+            while len(self._sent) >= PENDING_PAYLOADS:
+                self._sent.popitem(last=False)
+            self._sent[self._sequence] = (compressed_bytes, time.time())
+            return self._sequence
+
+    def record_received(self, compressed_bytes, decompressed_bytes, duration,
+                        sequence=None):
+        """Update the estimates with statistics reported by the browser.
+
+        duration is the decompression time in the browser, in seconds, and
+        sequence the number returned by record_sent for the payload, if the
+        statistics are of a single payload."""
+        sent = None
+        with self._lock:
+            if sequence is not None:
+                sent = self._sent.pop(sequence, None)
+        if sent is not None and sent[0] != compressed_bytes:
+            # The statistics are not of the whole payload
+            sent = None
+        if duration > 0.0 and decompressed_bytes > compressed_bytes:
+            self._update('decompression_throughput',
+                         decompressed_bytes / duration)
+        if sent is None:
+            return
+        transfer_time = time.time() - sent[1] - duration
+        if transfer_time > 0.0:
+            self._update('bandwidth', compressed_bytes / transfer_time)
+
+
+class PayloadCache(object):
+    """A least-recently-used cache of serialized payloads bounded by their
+    total size in bytes."""
+
+    def __init__(self, max_bytes=PAYLOAD_CACHE_SIZE):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._payloads = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._payloads)
+
+    def get(self, key):
+        """Return the cached payload for key, or None."""
+        with self._lock:
+            entry = self._payloads.pop(key, None)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._payloads[key] = entry
+            return entry[0]
+
+    def put(self, key, payload, nbytes):
+        """Cache a payload that holds nbytes of buffers."""
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._payloads.pop(key, None)
+            if previous is not None:
+                self.nbytes -= previous[1]
+            self._payloads[key] = (payload, nbytes)
+            self.nbytes += nbytes
+            while self.nbytes > self.max_bytes:
+                _, (_, evicted_bytes) = self._payloads.popitem(last=False)
+                self.nbytes -= evicted_bytes
+
+    def clear(self):
+        with self._lock:
+            self._payloads.clear()
+            self.nbytes = 0
+
+    def info(self):
+        """Hit and miss counts, and the number and size of the cached
+        payloads."""
+        with self._lock:
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'entries': len(self._payloads),
+                    'nbytes': self.nbytes,
+                    'max_bytes': self.max_bytes}
+
+
+# Number of evenly spaced elements of a pixel buffer in its sampled digest
+DIGEST_SAMPLES = 4096
+
+
+def sampled_digest(array):
+    """A digest of evenly spaced elements of an array.
+
+    It is part of the payload cache key of pixel buffers. Most edits made in
+    place, without a new modification time, change it, but not hashing the
+    whole buffer keeps the key cheap."""
+    flat = array.reshape(-1)
+    step = max(1, flat.size // DIGEST_SAMPLES)
+    return hash(flat[::step].tobytes())
+
+
+# Compressed images, keyed by the identity of their pixel buffer, their
+# modification time, a sampled digest of their pixels, and their metadata
+image_payload_cache = PayloadCache()
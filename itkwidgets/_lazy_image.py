@@ -0,0 +1,423 @@
+"""Images whose pixels are only computed for the regions that are rendered.
+
+Large, lazily evaluated arrays, e.g. dask arrays, arrays read on slicing,
+e.g. h5py datasets, zarr arrays or memory maps, and multiscale pyramids,
+e.g. OME-Zarr groups, are not materialized when they are passed to the
+Viewer. Only the downsampled region of interest is computed when it is
+rendered."""
+
+import math
+
+import itk
+import numpy as np
+
+from ._compression import get_executor
+from ._statistics import component_statistics
+from ._transform_types import is_arraylike
+
+have_dask = False
+try:
+    import dask.array
+    have_dask = True
+except ImportError:
+    pass
+have_zarr = False
+try:
+    import zarr
+    have_zarr = True
+except ImportError:
+    pass
+
+
+def _bin_shrink(array, factors):
+    """Average bins of the given size of a numpy array whose shape is a
+    multiple of the factors."""
+    shape = []
+    for size, factor in zip(array.shape, factors):
+        shape.extend((size // factor, factor))
+    binned = array.reshape(shape).mean(axis=tuple(range(1, 2 * array.ndim, 2)))
+    if np.issubdtype(array.dtype, np.integer):
+        # Round half up, as itk.BinShrinkImageFilter
+        binned = np.floor(binned + 0.5)
+    return binned.astype(array.dtype)
+
+
+# Number of bins whose label mode is computed at a time
+MODE_CHUNK_BINS = 1024 * 1024
+
+
+def _mode(blocks):
+    """The most frequent non-zero value of each row of a 2D array, or zero
+    if the row is background."""
+    mode = blocks[:, 0].copy()
+    # Most bins of a label image are uniform, and only the others are sorted
+    mixed = np.flatnonzero((blocks != mode[:, np.newaxis]).any(axis=-1))
+    if len(mixed) == 0:
+        return mode
+    blocks = np.sort(blocks[mixed], axis=-1)
+    positions = np.arange(blocks.shape[-1], dtype=np.int32)
+    run_starts = np.ones(blocks.shape, dtype=bool)
+    run_starts[:, 1:] = blocks[:, 1:] != blocks[:, :-1]
+    starts = np.where(run_starts, positions, 0)
+    np.maximum.accumulate(starts, axis=-1, out=starts)
+    # Count of the value so far in its run, which is its frequency at the
+    # end of the run
+    counts = positions - starts + 1
+    counts[blocks == 0] = 0
+    index = np.argmax(counts, axis=-1)
+    mode[mixed] = blocks[np.arange(blocks.shape[0]), index]
+    return mode
+
+
+def _mode_reduction(array, axis=None):
+    """Label mode over the given axes, which alternate with the bin axes, for
+    dask.array.coarsen."""
+    if axis is None:
+        return _mode(array.reshape((1, -1)))[0]
+    shape = array.shape[0::2]
+    bins = np.moveaxis(array, axis, tuple(range(-len(axis), 0)))
+    bins = bins.reshape((-1, int(np.prod(array.shape[1::2]))))
+    return _mode(bins).reshape(shape)
+
+
+def _label_mode_shrink(array, factors):
+    """The most frequent non-zero label of bins of the given size of a numpy
+    array whose shape is a multiple of the factors.
+
+    Unlike subsampling, small and thin labels stay visible in coarse bins.
+    Rows of bins are processed concurrently."""
+    shape = []
+    for size, factor in zip(array.shape, factors):
+        shape.extend((size // factor, factor))
+    bins_per_row = int(np.prod(shape[2::2]))
+    rows = max(1, MODE_CHUNK_BINS // max(1, bins_per_row))
+
+    def shrink_rows(start):
+        chunk = array[start * factors[0]:(start + rows) * factors[0]]
+        chunk_shape = list(shape)
+        chunk_shape[0] = chunk.shape[0] // factors[0]
+        return _mode_reduction(chunk.reshape(chunk_shape),
+                               tuple(range(1, 2 * array.ndim, 2)))
+    starts = range(0, shape[0], rows)
+    if len(starts) == 1:
+        return shrink_rows(0)
+    return np.concatenate(list(get_executor().map(shrink_rows, starts)))
+
+
+class LazyImage(object):
+    """An image backed by a lazily evaluated array.
+
+    Geometry queries, e.g. GetLargestPossibleRegion or
+    TransformPhysicalPointToIndex, are answered by an unallocated itk.Image
+    with the same metadata. Pixels are only computed by extract."""
+
+    def __init__(self, array, spacing=None, origin=None, direction=None):
+        self.array = array
+        dimension = array.ndim
+        image_type = type(itk.image_view_from_array(
+            np.zeros((1,) * dimension, dtype=array.dtype)))
+        self._geometry = image_type.New()
+        region = itk.ImageRegion[dimension]()
+        region.SetSize([int(s) for s in array.shape[::-1]])
+        self._geometry.SetRegions(region)
+        if spacing is not None:
+            self._geometry.SetSpacing([float(s) for s in spacing])
+        if origin is not None:
+            self._geometry.SetOrigin([float(o) for o in origin])
+        if direction is not None:
+            self._geometry.SetDirection(direction)
+
+    def __getattr__(self, name):
+        if name.startswith('__') or name == '_geometry':
+            raise AttributeError(name)
+        return getattr(self._geometry, name)
+
+    def _level(self, scale_factors):
+        """The array to extract pixels from for the scale factors and its
+        scale factors relative to the full resolution."""
+        return self.array, [1, ] * len(scale_factors)
+
+    def _shrink(self, array, factors, label):
+        """Shrink the array by the integer factors, in array axis order."""
+        if label:
+            return _label_mode_shrink(np.asarray(array), factors)
+        return _bin_shrink(np.asarray(array), factors)
+
+    def _compute(self, array):
+        """Evaluate the lazy array to a numpy array."""
+        return np.asarray(array)
+
+    def _read(self, source, slices, factors, label):
+        """Read the slices of the source array shrunk by the factors, in
+        array axis order."""
+        array = source[slices]
+        if any(factor > 1 for factor in factors):
+            array = self._shrink(array, factors, label)
+        return self._compute(array)
+
+    def statistics(self):
+        """Minimum and maximum of the finite pixel values, or None if there
+        are none or they cannot be computed without reading the whole
+        array. The rendered image then carries its own statistics."""
+        return component_statistics(self._compute(self.array))
+
+    def extract(self, region, scale_factors, label=False):
+        """Compute the pixels of the region, shrunk by the scale factors.
+
+        Intensities are averaged over each bin, as with
+        itk.BinShrinkImageFilter, while bins of labels take their most
+        frequent non-zero label."""
+        dimension = self._geometry.GetImageDimension()
+        scale_factors = [int(f) for f in scale_factors[:dimension]]
+        source, level_factors = self._level(scale_factors)
+        # Shrink the level by at least the remaining factors
+        remaining = [max(1, -(-factor // level_factor))
+                     for factor, level_factor in zip(scale_factors, level_factors)]
+        index = [int(i) // level_factor
+                 for i, level_factor in zip(region.GetIndex(), level_factors)]
+        size = [max(1, int(s) // level_factor)
+                for s, level_factor in zip(region.GetSize(), level_factors)]
+        source_size = source.shape[::-1]
+        # Trim partial bins
+        slices = []
+        for dim in reversed(range(dimension)):
+            size[dim] = min(size[dim], source_size[dim] - index[dim])
+            remaining[dim] = min(remaining[dim], size[dim])
+            upper = index[dim] + (size[dim] // remaining[dim]) * remaining[dim]
+            slices.append(slice(index[dim], upper))
+        array = self._read(source, tuple(slices), tuple(remaining[::-1]),
+                           label)
+        array = np.ascontiguousarray(array)
+        scale_factors = [level_factor * factor
+                         for level_factor, factor in zip(level_factors, remaining)]
+        index = [i * level_factor for i, level_factor in zip(index, level_factors)]
+
+        image = itk.image_from_array(array)
+        spacing = np.array(self._geometry.GetSpacing())
+        image.SetSpacing(spacing * scale_factors)
+        # Bins are centered on the mean of the pixels they cover
+        direction = itk.array_from_matrix(self._geometry.GetDirection())
+        offset = direction.dot((np.array(scale_factors) - 1) / 2.0 * spacing)
+        origin = np.array(self._geometry.TransformIndexToPhysicalPoint(index))
+        image.SetOrigin(origin + offset)
+        image.SetDirection(self._geometry.GetDirection())
+        return image
+
+
+class DaskImage(LazyImage):
+    """A LazyImage backed by a dask array.
+
+    Blocks are coarsened independently, so only the blocks of the region
+    are read and the full resolution region is never held in memory."""
+
+    def _shrink(self, array, factors, label):
+        # coarsen requires the block boundaries to align with the bins
+        chunks = tuple(max(factor, (chunk // factor) * factor)
+                       for chunk, factor in zip(array.chunksize, factors))
+        array = array.rechunk(chunks)
+        if label:
+            return dask.array.coarsen(_mode_reduction, array,
+                                      dict(enumerate(factors)),
+                                      trim_excess=True)
+        dtype = array.dtype
+        shrunk = dask.array.coarsen(np.mean, array, dict(enumerate(factors)),
+                                    trim_excess=True)
+        if np.issubdtype(dtype, np.integer):
+            shrunk = dask.array.floor(shrunk + 0.5)
+        return shrunk.astype(dtype)
+
+    def _compute(self, array):
+        return array.compute()
+
+    def statistics(self):
+        return None
+
+
+class ChunkedImage(LazyImage):
+    """A LazyImage backed by an array that is read on slicing, e.g. an h5py
+    dataset, a zarr array or a memory map.
+
+    The region is read in slabs along the slowest axis that are shrunk
+    concurrently, so memory is bounded by the rendered size rather than the
+    size of the region."""
+
+    def _read(self, source, slices, factors, label):
+        outer = slices[0]
+        factor = factors[0]
+        # Slabs span whole chunks and whole bins, so each chunk is read once
+        chunks = getattr(source, 'chunks', None)
+        chunk = chunks[0] if chunks else 1
+        height = chunk * factor // math.gcd(chunk, factor)
+        starts = range(outer.start, outer.stop, height)
+        shrink = _label_mode_shrink if label else _bin_shrink
+
+        def read_slab(start):
+            stop = min(start + height, outer.stop)
+            slab = np.asarray(source[(slice(start, stop),) + slices[1:]])
+            return shrink(slab, factors)
+        if len(starts) == 1:
+            return read_slab(starts[0])
+        return np.concatenate(list(get_executor().map(read_slab, starts)))
+
+    def statistics(self):
+        return None
+
+
+class MultiscaleImage(ChunkedImage):
+    """A ChunkedImage backed by a multiscale pyramid of arrays.
+
+    Pixels are read from the coarsest level whose scale factors divide the
+    requested scale factors, so the full resolution level is only read when
+    the region of interest requires it."""
+
+    def __init__(self, levels, spacing=None, origin=None, direction=None):
+        super(MultiscaleImage, self).__init__(levels[0], spacing=spacing,
+                                              origin=origin,
+                                              direction=direction)
+        self.levels = levels
+        shape = np.array(levels[0].shape[::-1])
+        # Scale factors of each level relative to the full resolution, in
+        # index order
+        self.level_factors = [
+            [max(1, int(round(factor)))
+             for factor in shape / np.array(level.shape[::-1])]
+            for level in levels]
+
+    def _level(self, scale_factors):
+        selected = 0
+        for level, level_factors in enumerate(self.level_factors):
+            # Other levels would render at a different resolution
+            if all(factor % level_factor == 0 for level_factor, factor
+                   in zip(level_factors, scale_factors)):
+                selected = level
+        return self.levels[selected], self.level_factors[selected]
+
+    def statistics(self):
+        """Minimum and maximum of the finite pixel values of the coarsest
+        level, whose bins slightly narrow the range of the full resolution
+        level."""
+        return component_statistics(np.asarray(self.levels[-1]))
+
+    def statistics(self):
+        # Estimated from the coarsest level
+        level = self.levels[-1]
+        return component_statistics(
+            np.asarray(level[(slice(None),) * level.ndim]))
+
+
+def image_pyramid(image, size_limit, label=False):
+    """A MultiscaleImage of an itk.Image whose levels are halved until they
+    fit in the size limit.
+
+    Intensities are binned with itk.BinShrinkImageFilter and bins of labels
+    take their most frequent non-zero label."""
+    images = [image]
+    levels = [itk.array_view_from_image(image)]
+    size = image.GetLargestPossibleRegion().GetSize()
+    while any(size[dim] > size_limit[dim] for dim in range(len(size))):
+        factors = [2 if s > 1 else 1 for s in size]
+        if label:
+            level = levels[-1]
+            level = level[tuple(slice(0, (s // f) * f) for s, f in
+                                zip(level.shape, factors[::-1]))]
+            levels.append(_label_mode_shrink(level, factors[::-1]))
+            size = levels[-1].shape[::-1]
+            continue
+        shrinker = itk.BinShrinkImageFilter.New(images[-1])
+        shrinker.SetShrinkFactors(factors)
+        shrinker.UpdateLargestPossibleRegion()
+        level = shrinker.GetOutput()
+        level.DisconnectPipeline()
+        images.append(level)
+        levels.append(itk.array_view_from_image(level))
+        size = level.GetLargestPossibleRegion().GetSize()
+    pyramid = MultiscaleImage(levels,
+                              spacing=image.GetSpacing(),
+                              origin=image.GetOrigin(),
+                              direction=image.GetDirection())
+    # The levels are views of the images' buffers
+    pyramid.images = images
+    return pyramid
+
+
+def _ome_zarr_transform(transforms, dimension):
+    """The scale and translation of a sequence of OME-Zarr coordinate
+    transformations, applied in order."""
+    scale = [1.0, ] * dimension
+    translation = [0.0, ] * dimension
+    for transform in transforms:
+        if transform['type'] == 'scale':
+            scale = [s * t for s, t in zip(scale, transform['scale'])]
+            translation = [d * t for d, t in zip(translation,
+                                                 transform['scale'])]
+        elif transform['type'] == 'translation':
+            translation = [d + t for d, t in zip(translation,
+                                                 transform['translation'])]
+    return scale, translation
+
+
+def _ome_zarr_multiscale(group):
+    """A MultiscaleImage for an OME-Zarr multiscale group.
+
+    Only the spatial axes are kept; the first index is taken along time and
+    channel axes. Groups without axes, i.e. versions 0.1 and 0.2, are TCZYX.
+    The spacing and origin are the coordinate transformations of the full
+    resolution dataset followed by those of the multiscale."""
+    multiscales = group.attrs['multiscales'][0]
+    datasets = multiscales['datasets']
+    dimension = group[datasets[0]['path']].ndim
+    axes = multiscales.get('axes', list('tczyx'[-dimension:]))
+    axes = [{'name': axis} if isinstance(axis, str) else axis
+            for axis in axes]
+    space_axes = [index for index, axis in enumerate(axes)
+                  if axis.get('type', 'space') == 'space' and
+                  axis['name'] in ('x', 'y', 'z')]
+    selection = tuple(slice(None) if index in space_axes else 0
+                      for index in range(len(axes)))
+    levels = []
+    for dataset in datasets:
+        array = group[dataset['path']]
+        if len(space_axes) < array.ndim:
+            array = _Selection(array, selection)
+        levels.append(array)
+    transforms = datasets[0].get('coordinateTransformations', []) + \
+        multiscales.get('coordinateTransformations', [])
+    scale, translation = _ome_zarr_transform(transforms, dimension)
+    spacing = [scale[index] for index in space_axes][::-1]
+    origin = [translation[index] for index in space_axes][::-1]
+    return MultiscaleImage(levels, spacing=spacing, origin=origin)
+
+
+class _Selection(object):
+    """The spatial axes of an array with time or channel axes, read on
+    slicing."""
+
+    def __init__(self, array, selection):
+        self.array = array
+        self.selection = selection
+        self.dtype = array.dtype
+        self.shape = tuple(size for size, index in zip(array.shape, selection)
+                           if isinstance(index, slice))
+        self.ndim = len(self.shape)
+
+    def __getitem__(self, slices):
+        slices = iter(slices)
+        selection = tuple(next(slices) if isinstance(index, slice) else index
+                          for index in self.selection)
+        return self.array[selection]
+
+
+def to_lazy_image(image_like):
+    """A LazyImage for lazily evaluated arrays, arrays read on slicing and
+    multiscale pyramids, or None."""
+    if isinstance(image_like, LazyImage):
+        return image_like
+    if have_dask and isinstance(image_like, dask.array.core.Array):
+        return DaskImage(image_like)
+    if have_zarr and isinstance(image_like, zarr.Group) and \
+            'multiscales' in image_like.attrs:
+        return _ome_zarr_multiscale(image_like)
+    if is_arraylike(image_like) and (isinstance(image_like, np.memmap) or
+                                     hasattr(image_like, 'chunks')):
+        return ChunkedImage(image_like)
+    return None
@@ -0,0 +1,123 @@
+"""Scheduling of viewer updates on the asyncio event loop of the kernel."""
+
+import asyncio
+import weakref
+
+# Seconds between the start of throttled updates
+DEFAULT_INTERVAL = 0.2
+# Seconds to wait for the browser to acknowledge an update before the next
+# one is started anyway, e.g. when the views of the widget were closed
+ACKNOWLEDGEMENT_TIMEOUT = 5.0
+
+
+def running_loop():
+    """The running event loop, e.g. the kernel's, or None outside of one."""
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:
+        # Python < 3.7
+        loop = asyncio.get_event_loop()
+        if loop.is_running():
+            return loop
+        return None
+    except RuntimeError:
+        return None
+
+
+class UpdateScheduler(object):
+    """Throttle and coalesce updates of a widget.
+
+    Requests made while an update is scheduled are coalesced into it. The
+    first request after a quiet interval runs on the next iteration of the
+    event loop (leading edge), and requests within the interval run once
+    at its end (trailing edge). With acknowledgements, an update is not
+    started until the previous one is acknowledged, or the acknowledgement
+    times out. Only a weak reference to the widget is held, so a pending
+    update does not keep a closed widget alive.
+
+    Outside of an event loop, e.g. in scripts and tests, updates run
+    immediately."""
+
+    def __init__(self, widget, update, interval=DEFAULT_INTERVAL,
+                 acknowledged=False,
+                 acknowledgement_timeout=ACKNOWLEDGEMENT_TIMEOUT):
+        self._widget = weakref.ref(widget)
+        self._update = update
+        self.interval = interval
+        self.acknowledged = acknowledged
+        self.acknowledgement_timeout = acknowledgement_timeout
+        self._loop = None
+        self._handle = None
+        self._timeout_handle = None
+        self._pending = False
+        self._awaiting = False
+        self._last_start = None
+        self._closed = False
+
+    @property
+    def pending(self):
+        """An update has been requested but not started."""
+        return self._pending
+
+    def request(self):
+        """Request an update of the widget."""
+        if self._closed:
+            return
+        self._pending = True
+        loop = running_loop()
+        if loop is None:
+            self._start()
+            return
+        self._loop = loop
+        self._schedule()
+
+    def acknowledge(self):
+        """Acknowledge that the last update was applied, e.g. rendered by the
+        browser."""
+        self._awaiting = False
+        if self._timeout_handle is not None:
+            self._timeout_handle.cancel()
+            self._timeout_handle = None
+        if self._pending and self._loop is not None:
+            self._schedule()
+
+    def close(self):
+        """Cancel pending updates and stop scheduling new ones."""
+        self._closed = True
+        self._pending = False
+        for handle in (self._handle, self._timeout_handle):
+            if handle is not None:
+                handle.cancel()
+        self._handle = None
+        self._timeout_handle = None
+
+    def _schedule(self):
+        if self._handle is not None or self._awaiting:
+            # Coalesced into the scheduled or the next update
+            return
+        delay = 0.0
+        if self._last_start is not None:
+            delay = self.interval - (self._loop.time() - self._last_start)
+        if delay <= 0.0:
+            self._handle = self._loop.call_soon(self._fire)
+        else:
+            self._handle = self._loop.call_later(delay, self._fire)
+
+    def _fire(self):
+        self._handle = None
+        if not self._pending or self._awaiting:
+            return
+        if self.acknowledged:
+            self._awaiting = True
+            self._timeout_handle = self._loop.call_later(
+                self.acknowledgement_timeout, self.acknowledge)
+        self._last_start = self._loop.time()
+        self._start()
+
+    def _start(self):
+        self._pending = False
+        widget = self._widget()
+        if widget is None:
+            self.close()
+            return
+        self._update(widget)
@@ -0,0 +1,121 @@
+"""Vectorized, chunked statistics of pixel buffers."""
+
+import collections
+import warnings
+
+import numpy as np
+
+from ._compression import get_executor
+
+# Number of array elements reduced at a time
+CHUNK_ELEMENTS = 16 * 1024 * 1024
+
+
+def _chunks(array, chunk_elements=CHUNK_ELEMENTS):
+    flat = array.reshape(-1)
+    return [flat[offset:offset + chunk_elements]
+            for offset in range(0, flat.size, chunk_elements)]
+
+
+def value_range(array):
+    """Minimum and maximum of an array.
+
+    Chunks of the array are reduced concurrently to bound the size of the
+    temporaries and use all cores."""
+    chunks = _chunks(np.ascontiguousarray(array))
+    if len(chunks) == 1:
+        return chunks[0].min(), chunks[0].max()
+
+    def chunk_range(chunk):
+        return chunk.min(), chunk.max()
+    ranges = list(get_executor().map(chunk_range, chunks))
+    return min(r[0] for r in ranges), max(r[1] for r in ranges)
+
+
+def _component_range(chunk):
+    if chunk.dtype.kind == 'f':
+        # Infinite values are excluded like NaN
+        chunk = np.where(np.isfinite(chunk), chunk, np.nan)
+        with warnings.catch_warnings():
+            # Components without finite values reduce to NaN
+            warnings.simplefilter('ignore', RuntimeWarning)
+            return np.nanmin(chunk, axis=0), np.nanmax(chunk, axis=0)
+    return chunk.min(axis=0), chunk.max(axis=0)
+
+
+def component_statistics(array, components=1):
+    """Minimum and maximum of the finite values of each component of a pixel
+    buffer, or None if a component has no finite values.
+
+    Chunks of the buffer are reduced concurrently."""
+    values = np.ascontiguousarray(array).reshape((-1, components))
+    if not values.size:
+        return None
+    rows = max(1, CHUNK_ELEMENTS // components)
+    chunks = [values[offset:offset + rows]
+              for offset in range(0, values.shape[0], rows)]
+    ranges = list(get_executor().map(_component_range, chunks))
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        minimum = np.nanmin([r[0] for r in ranges], axis=0)
+        maximum = np.nanmax([r[1] for r in ranges], axis=0)
+    if np.any(np.isnan(minimum)):
+        return None
+    return {'min': [float(m) for m in minimum],
+            'max': [float(m) for m in maximum]}
+
+
+# Largest label value counted with np.bincount instead of np.unique
+BINCOUNT_MAX_LABEL = 1 << 16
+# Number of labels counted at a time
+BINCOUNT_CHUNK_ELEMENTS = 1024 * 1024
+
+LabelInventory = collections.namedtuple('LabelInventory',
+                                        ['labels', 'counts', 'bounding_boxes'])
+
+
+def _present(array, axis, size):
+    """Which of the size compact labels are in each slice along axis."""
+    def slice_present(index):
+        return np.bincount(np.take(array, index, axis=axis).ravel(),
+                           minlength=size) > 0
+    return np.stack(list(get_executor().map(slice_present,
+                                            range(array.shape[axis]))))
+
+
+def label_inventory(array):
+    """The labels of a label map, their number of pixels and their bounding
+    boxes.
+
+    The bounding boxes are the lower and upper index of each label, in ITK
+    index order, i.e. reversed array axis order. Integer labels smaller than
+    BINCOUNT_MAX_LABEL are counted with np.bincount, without sorting."""
+    array = np.ascontiguousarray(array)
+    minimum, maximum = -1, BINCOUNT_MAX_LABEL
+    if array.dtype.kind in 'iu' and array.size:
+        minimum, maximum = value_range(array)
+    if minimum >= 0 and maximum < BINCOUNT_MAX_LABEL:
+        size = int(maximum) + 1
+        compact = array
+        # np.bincount converts chunks to intp
+        chunks = _chunks(array, BINCOUNT_CHUNK_ELEMENTS)
+        counts = np.sum(list(get_executor().map(
+            lambda chunk: np.bincount(chunk, minlength=size), chunks)),
+            axis=0)
+        labels = np.flatnonzero(counts)
+        counts = counts[labels]
+    else:
+        labels, compact, counts = np.unique(array, return_inverse=True,
+                                            return_counts=True)
+        compact = compact.reshape(array.shape)
+        size = len(labels)
+    bounding_boxes = np.zeros((len(labels), 2, array.ndim), dtype=np.int64)
+    for axis in range(array.ndim):
+        present = _present(compact, axis, size)
+        if size != len(labels):
+            present = present[:, labels]
+        dim = array.ndim - 1 - axis
+        bounding_boxes[:, 0, dim] = np.argmax(present, axis=0)
+        bounding_boxes[:, 1, dim] = present.shape[0] - 1 - \
+            np.argmax(present[::-1], axis=0)
+    return LabelInventory(labels, counts, bounding_boxes)
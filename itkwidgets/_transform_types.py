@@ -235,6 +235,13 @@ def to_itk_image(image_like):
     if isinstance(image_like, itk.Image):
         return image_like
 
+    from ._lazy_image import LazyImage
+    if isinstance(image_like, LazyImage):
+        # Materialize the full resolution pixels
+        dimension = image_like.GetImageDimension()
+        return image_like.extract(image_like.GetLargestPossibleRegion(),
+                                  [1, ] * dimension)
+
     if is_arraylike(image_like):
         array = np.asarray(image_like)
         case_use_view = array.flags['OWNDATA']
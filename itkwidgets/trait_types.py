@@ -1,5 +1,7 @@
 import os
 import six
+import hashlib
+import functools
 import collections
 from datetime import datetime
 
@@ -7,16 +9,11 @@ import traitlets
 import itk
 import numpy as np
 import matplotlib.colors
-try:
-    import zstandard as zstd
-except ImportError:
-    import zstd
-try:
-    from functools import reduce
-except ImportError:
-    pass
 
 from ._transform_types import to_itk_image, to_point_set, to_geometry
+from . import _compression
+from ._lazy_image import to_lazy_image
+from ._statistics import component_statistics, value_range
 from ipydatawidgets import array_serialization
 
 # from IPython.core.debugger import set_trace
@@ -34,6 +31,11 @@ class ITKImage(traitlets.TraitType):
     def validate(self, obj, value):
         self._source_object = value
 
+        lazy_image = to_lazy_image(value)
+        if lazy_image is not None:
+            # Pixels are computed when the image is rendered
+            return lazy_image
+
         if not isinstance(value, itk.Image) and not isinstance(value,
                 itk.ProcessObject):
             image_from_array = to_itk_image(value)
@@ -49,6 +51,17 @@ class ITKImage(traitlets.TraitType):
             value = itk.output(value)
             grafted = value.__New_orig__()
             grafted.Graft(value)
+            # The graft has a new modification time. Keep the source's so
+            # unchanged pixel data can be recognized when it is serialized.
+            grafted._source_mtime = value.GetMTime()
+            # Statistics of the full resolution image a rendered image was
+            # downsampled from
+            statistics = getattr(value, '_statistics', None)
+            if statistics is not None:
+                grafted._statistics = statistics
+            # Progressive previews are not acknowledged by the browser
+            if getattr(value, '_preview', False):
+                grafted._preview = True
             return grafted
         except BaseException:
             self.error(obj, value)
@@ -119,7 +132,52 @@ def _image_to_type(itkimage):  # noqa: C901
     return _python_to_js[mangle], pixelType
 
 
-def itkimage_to_json(itkimage, manager=None):
+# Integer types, ordered by size, that pixel values may be narrowed to
+_narrow_integer_types = (
+    (np.uint8, 'uint8_t'),
+    (np.int8, 'int8_t'),
+    (np.uint16, 'uint16_t'),
+    (np.int16, 'int16_t'),
+    (np.uint32, 'uint32_t'),
+    (np.int32, 'int32_t'),
+)
+
+
+def _narrow_integer_type(pixel_arr):
+    """Convert an integer array to the smallest type that holds its values.
+
+    Returns the array and its JavaScript component type, or None if no
+    smaller type holds the values."""
+    if pixel_arr.size == 0:
+        return None
+    minimum, maximum = value_range(pixel_arr)
+    for dtype, componentType in _narrow_integer_types:
+        if np.dtype(dtype).itemsize >= pixel_arr.dtype.itemsize:
+            return None
+        info = np.iinfo(dtype)
+        if minimum >= info.min and maximum <= info.max:
+            return pixel_arr.astype(dtype), componentType
+    return None
+
+
+def _adaptive_compression(manager):
+    """The AdaptiveLevel of a widget that selects its compression level
+    automatically, otherwise None."""
+    if getattr(manager, 'compression_level', None) == 'auto':
+        return manager._adaptive_compression
+    return None
+
+
+def _compression_level(manager, buffers):
+    """The compression level for the buffers of a payload, or None to send
+    them uncompressed."""
+    adaptive = _adaptive_compression(manager)
+    if adaptive is not None:
+        return adaptive.select(buffers)
+    return getattr(manager, 'compression_level', _compression.DEFAULT_LEVEL)
+
+
+def itkimage_to_json(itkimage, manager=None, component_ranges=True):
     """Serialize a Python itk.Image object.
 
     Attributes of this dictionary are to be passed to the JavaScript itkimage
@@ -132,8 +190,56 @@ def itkimage_to_json(itkimage, manager=None):
         directionMatrix = direction.GetVnlMatrix()
         directionList = []
         dimension = itkimage.GetImageDimension()
+        for col in range(dimension):
+            for row in range(dimension):
+                directionList.append(directionMatrix.get(row, col))
         pixel_arr = itk.array_view_from_image(itkimage)
         componentType, pixelType = _image_to_type(itkimage)
+        imageType = dict(
+            dimension=dimension,
+            componentType=componentType,
+            pixelType=pixelType,
+            components=itkimage.GetNumberOfComponentsPerPixel()
+        )
+        origin = tuple(itkimage.GetOrigin())
+        spacing = tuple(itkimage.GetSpacing())
+        size = tuple(itkimage.GetBufferedRegion().GetSize())
+        narrow_integer_types = getattr(manager, 'narrow_integer_types', False)
+        shuffle = getattr(manager, 'compression_shuffle', 'none')
+        preview = getattr(itkimage, '_preview', False)
+
+        adaptive = _adaptive_compression(manager)
+        cache_key = (pixel_arr.__array_interface__['data'][0],
+                     pixel_arr.nbytes,
+                     getattr(itkimage, '_source_mtime', itkimage.GetMTime()),
+                     _compression.sampled_digest(pixel_arr),
+                     componentType, pixelType, imageType['components'],
+                     origin, spacing, size, tuple(directionList),
+                     getattr(manager, 'compression_level',
+                             _compression.DEFAULT_LEVEL),
+                     narrow_integer_types, shuffle, component_ranges, preview)
+        cached = _compression.image_payload_cache.get(cache_key)
+        if cached is not None:
+            if adaptive is not None:
+                sequence = adaptive.record_sent(
+                    _compression.compressed_size(cached['compressedData']))
+                return dict(cached, sequence=sequence)
+            return cached
+
+        # Sent so the browser does not scan the pixels for the component
+        # ranges
+        statistics = None
+        if component_ranges:
+            statistics = getattr(itkimage, '_statistics', None)
+            if statistics is None and pixel_arr.dtype.kind in 'iuf':
+                statistics = component_statistics(pixel_arr,
+                                                  imageType['components'])
+
+        if narrow_integer_types and pixel_arr.dtype.kind in 'iu':
+            narrowed = _narrow_integer_type(pixel_arr)
+            if narrowed is not None:
+                pixel_arr, componentType = narrowed
+                imageType['componentType'] = componentType
         if 'int64' in componentType:
             # JavaScript does not yet support 64-bit integers well
             if componentType == 'uint64_t':
@@ -142,28 +248,51 @@ def itkimage_to_json(itkimage, manager=None):
             else:
                 pixel_arr = pixel_arr.astype(np.int32)
                 componentType = 'int32_t'
-        compressor = zstd.ZstdCompressor(level=3)
-        compressed = compressor.compress(pixel_arr.data)
-        pixel_arr_compressed = memoryview(compressed)
-        for col in range(dimension):
-            for row in range(dimension):
-                directionList.append(directionMatrix.get(row, col))
-        imageType = dict(
-            dimension=dimension,
-            componentType=componentType,
-            pixelType=pixelType,
-            components=itkimage.GetNumberOfComponentsPerPixel()
-        )
-        return dict(
+            imageType['componentType'] = componentType
+        chunk_size = _compression.CHUNK_SIZE
+        level = _compression_level(manager, [pixel_arr.data])
+        itemsize = pixel_arr.dtype.itemsize
+        if level is None or (shuffle == 'byte' and itemsize == 1):
+            shuffle = 'none'
+        pixel_arr_compressed = _compression.compress(pixel_arr.data,
+                                                     level=level,
+                                                     chunk_size=chunk_size,
+                                                     shuffle=shuffle,
+                                                     itemsize=itemsize)
+        compressed_size = _compression.compressed_size(pixel_arr_compressed)
+        result = dict(
             imageType=imageType,
-            origin=tuple(itkimage.GetOrigin()),
-            spacing=tuple(itkimage.GetSpacing()),
-            size=tuple(itkimage.GetBufferedRegion().GetSize()),
+            origin=origin,
+            spacing=spacing,
+            size=size,
             direction={'data': directionList,
                        'rows': dimension,
                        'columns': dimension},
             compressedData=pixel_arr_compressed
         )
+        if isinstance(pixel_arr_compressed, list):
+            # Multi-frame encoding: the uncompressed size of every frame but
+            # the last
+            result['chunkSize'] = chunk_size
+        if shuffle != 'none':
+            result['shuffle'] = shuffle
+        if statistics is not None:
+            result['statistics'] = statistics
+        if preview:
+            result['preview'] = True
+        if level is None:
+            result['compression'] = 'raw'
+        else:
+            # Uncompressed payloads are views of the pixel buffer, and are
+            # cheap to re-create
+            _compression.image_payload_cache.put(cache_key, result,
+                                                 compressed_size)
+        if adaptive is not None:
+            # The browser reports the statistics of the payload with its
+            # sequence number
+            result = dict(result,
+                          sequence=adaptive.record_sent(compressed_size))
+        return result
 
 
 def _type_to_image(jstype):
@@ -224,33 +353,38 @@ def _type_to_image(jstype):
     return getattr(itk.Image, prefix), dtype
 
 
+def _compressed_frame(buffer):
+    if six.PY2:
+        return np.frombuffer(buffer.tobytes(), dtype=np.uint8)
+    return np.frombuffer(buffer, dtype=np.uint8)
+
+
+def _compressed_values(compressed):
+    """A compressed buffer, or a list of frames of a multi-frame encoding."""
+    if isinstance(compressed, (list, tuple)):
+        return [_compressed_frame(frame) for frame in compressed]
+    return _compressed_frame(compressed)
+
+
 def itkimage_from_json(js, manager=None):
     """Deserialize a Javascript itk.js Image object."""
     if js is None:
         return None
     else:
         ImageType, dtype = _type_to_image(js['imageType'])
-        decompressor = zstd.ZstdDecompressor()
-        if six.PY2:
-            asBytes = js['compressedData'].tobytes()
-            pixelBufferArrayCompressed = np.frombuffer(asBytes, dtype=np.uint8)
-        else:
-            pixelBufferArrayCompressed = np.frombuffer(js['compressedData'],
-                                                       dtype=np.uint8)
-        pixelCount = reduce(lambda x, y: x * y, js['size'], 1)
-        numberOfBytes = pixelCount * \
-            js['imageType']['components'] * np.dtype(dtype).itemsize
-        pixelBufferArray = \
-            np.frombuffer(decompressor.decompress(pixelBufferArrayCompressed,
-                                                  numberOfBytes),
-                          dtype=dtype)
-        pixelBufferArray.shape = js['size'][::-1]
-        # Workaround for GetImageFromArray required until 5.0.1
-        # and https://github.com/numpy/numpy/pull/11739
-        pixelBufferArrayCopyToBeRemoved = pixelBufferArray.copy()
-        # image = itk.PyBuffer[ImageType].GetImageFromArray(pixelBufferArray)
-        image = itk.PyBuffer[ImageType].GetImageFromArray(
-            pixelBufferArrayCopyToBeRemoved)
+        pixelBufferArrayCompressed = _compressed_values(js['compressedData'])
+        # Decompress directly into the pixel buffer of the image
+        image = ImageType.New()
+        region = itk.ImageRegion[js['imageType']['dimension']]()
+        region.SetSize(js['size'])
+        image.SetRegions(region)
+        image.Allocate()
+        _compression.decompress_into(pixelBufferArrayCompressed,
+                                     itk.array_view_from_image(image),
+                                     js.get('chunkSize'),
+                                     js.get('compression', 'zstd'),
+                                     js.get('shuffle', 'none'),
+                                     np.dtype(dtype).itemsize)
         Dimension = image.GetImageDimension()
         image.SetOrigin(js['origin'])
         image.SetSpacing(js['spacing'])
@@ -268,6 +402,20 @@ itkimage_serialization = {
     'to_json': itkimage_to_json
 }
 
+
+def itklabelimage_to_json(itkimage, manager=None):
+    """Serialize a Python itk.Image label map.
+
+    The browser does not use component ranges for label maps, so they are not
+    computed."""
+    return itkimage_to_json(itkimage, manager, component_ranges=False)
+
+
+itklabelimage_serialization = {
+    'from_json': itkimage_from_json,
+    'to_json': itklabelimage_to_json
+}
+
 class ImagePoint(object):
     """Data from a picked point on an image slice."""
 
@@ -369,20 +517,221 @@ class PolyDataList(traitlets.TraitType):
             self.error(obj, value)
 
 
-def polydata_list_to_json(polydata_list, manager=None):  # noqa: C901
+def polydata_list_buffers(polydata_list):
+    """The buffers of the points, cells, and data arrays of a list of
+    vtk.js PolyData-like objects."""
+    buffers = []
+    for polydata in polydata_list:
+        if 'points' in polydata:
+            buffers.append(polydata['points']['values'].data)
+        for cell_type in ['verts', 'lines', 'polys', 'strips']:
+            if cell_type in polydata:
+                buffers.append(polydata[cell_type]['values'].data)
+        for data_type in ['pointData', 'cellData']:
+            if data_type in polydata:
+                for array in polydata[data_type]['arrays']:
+                    buffers.append(array['data']['values'].data)
+    return buffers
+
+
+def polydata_fingerprint(polydata):
+    """A digest of the content of a vtk.js PolyData-like object."""
+    digest = hashlib.sha1()
+
+    def update(value):
+        if isinstance(value, dict):
+            for key in sorted(value.keys()):
+                digest.update(str(key).encode('utf-8'))
+                update(value[key])
+        elif isinstance(value, (list, tuple)):
+            digest.update(b'[')
+            for item in value:
+                update(item)
+            digest.update(b']')
+        elif isinstance(value, np.ndarray):
+            digest.update('{0}{1}'.format(value.dtype.str,
+                                          value.shape).encode('utf-8'))
+            digest.update(np.ascontiguousarray(value).view(np.uint8))
+        else:
+            digest.update(repr(value).encode('utf-8'))
+    update(polydata)
+    return digest.hexdigest()
+
+
+# Number of points quantized at a time
+_QUANTIZATION_CHUNK_POINTS = 1024 * 1024
+
+
+def quantize_points(values, error_bound):
+    """Quantize point coordinates to uint16 within their bounding box.
+
+    Returns the quantized points, and the per-axis offset and scale such that
+    the coordinates are offset + quantized * scale. Returns None if the
+    quantization error, half the scale, exceeds error_bound on any axis."""
+    points = np.asarray(values).reshape(-1, 3)
+    if points.shape[0] == 0:
+        return None
+    offset = points.min(axis=0).astype(np.float64)
+    scale = (points.max(axis=0) - offset) / 65535.0
+    if np.any(scale / 2.0 > error_bound) or not np.all(np.isfinite(scale)):
+        return None
+    safe_scale = np.where(scale > 0.0, scale, 1.0)
+    quantized = np.empty(points.shape, dtype=np.uint16)
+    for start in range(0, points.shape[0], _QUANTIZATION_CHUNK_POINTS):
+        stop = start + _QUANTIZATION_CHUNK_POINTS
+        quantized[start:stop] = np.rint(
+            (points[start:stop] - offset) / safe_scale)
+    return quantized, offset, scale
+
+
+def dequantize_points(quantized, offset, scale, dtype=np.float32):
+    """Inverse of quantize_points."""
+    points = np.empty(quantized.shape, dtype=dtype)
+    offset = np.asarray(offset, dtype=np.float64)
+    scale = np.asarray(scale, dtype=np.float64)
+    for start in range(0, quantized.shape[0], _QUANTIZATION_CHUNK_POINTS):
+        stop = start + _QUANTIZATION_CHUNK_POINTS
+        points[start:stop] = offset + quantized[start:stop] * scale
+    return points
+
+
+# Cell array types that are encoded compactly
+_cell_data_types = ('Uint32Array', 'Int32Array')
+
+# Number of cells encoded at a time
+_CELL_CHUNK_SIZE = 1024 * 1024
+
+
+def encode_cells(values):
+    """Encode a vtk.js cell array, [n, i0, i1, ..., n, j0, ...], compactly.
+
+    If all the cells have the same number of points, the point indices are
+    delta coded along the array, and zigzag coded to unsigned integers. The
+    counts are kept in place. The result is stored with 16-bit integers if
+    the values allow it.
+
+    Returns the encoded values, their vtk.js data type, and the cell size if
+    the indices are delta coded, or None if the values cannot be encoded
+    more compactly."""
+    values = np.asarray(values).reshape(-1)
+    if values.size == 0 or values.dtype.itemsize <= 2:
+        return None
+    cell_size = int(values[0])
+    encoded = None
+    if cell_size > 0 and values.size % (cell_size + 1) == 0 and \
+            np.all(values[::cell_size + 1] == cell_size):
+        cells = values.reshape(-1, cell_size + 1)
+        encoded = np.empty(cells.shape, dtype=np.uint32)
+        encoded[:, 0] = cell_size
+        previous = 0
+        for start in range(0, cells.shape[0], _CELL_CHUNK_SIZE):
+            stop = start + _CELL_CHUNK_SIZE
+            indices = cells[start:stop, 1:].astype(np.int64).reshape(-1)
+            deltas = np.empty_like(indices)
+            deltas[0] = indices[0] - previous
+            deltas[1:] = indices[1:] - indices[:-1]
+            previous = indices[-1]
+            zigzag = (deltas << 1) ^ (deltas >> 63)
+            if zigzag.max() > np.iinfo(np.uint32).max:
+                encoded = None
+                break
+            encoded[start:stop, 1:] = zigzag.reshape(-1, cell_size)
+    if encoded is None:
+        cell_size = None
+        encoded = values
+    encoded = encoded.reshape(-1)
+    minimum, maximum = value_range(encoded)
+    if minimum >= 0 and maximum <= np.iinfo(np.uint16).max:
+        return encoded.astype(np.uint16), 'Uint16Array', cell_size
+    if cell_size is None:
+        return None
+    return encoded, 'Uint32Array', cell_size
+
+
+def decode_cells(encoded, dtype, cell_size=None):
+    """Inverse of encode_cells."""
+    if cell_size is None:
+        return encoded.astype(dtype)
+    cells = encoded.reshape(-1, cell_size + 1)
+    values = np.empty(cells.shape, dtype=dtype)
+    values[:, 0] = cells[:, 0]
+    previous = 0
+    for start in range(0, cells.shape[0], _CELL_CHUNK_SIZE):
+        stop = start + _CELL_CHUNK_SIZE
+        zigzag = cells[start:stop, 1:].astype(np.int64).reshape(-1)
+        deltas = (zigzag >> 1) ^ -(zigzag & 1)
+        indices = np.cumsum(deltas) + previous
+        previous = indices[-1]
+        values[start:stop, 1:] = indices.reshape(-1, cell_size)
+    return values.reshape(-1)
+
+
+def _synced_fingerprints(manager, trait_name):
+    """The fingerprints of the entries of a polydata list trait held by the
+    browser, or None if entries are not sent incrementally."""
+    if trait_name is None:
+        return None
+    synced = getattr(manager, '_synced_fingerprints', None)
+    if synced is None:
+        return None
+    return synced.setdefault(trait_name, set())
+
+
+def polydata_list_to_json(polydata_list, manager=None,  # noqa: C901
+                          trait_name=None):
     """Serialize a list of a Python object that represents vtk.js PolyData.
 
     The returned data is compatibile with vtk.js PolyData with compressed data
     buffers.
+
+    If trait_name is given, and the manager records the fingerprints of the
+    entries of the trait that the browser holds in its _synced_fingerprints
+    dict, entries the browser already holds are sent as {'fingerprint': ...}
+    stubs, and all other entries carry their fingerprint.
     """
+    synced = _synced_fingerprints(manager, trait_name)
     if polydata_list is None:
+        if synced is not None:
+            synced.clear()
         return None
     else:
-        compressor = zstd.ZstdCompressor(level=3)
+        fingerprints = None
+        held = set()
+        if synced is not None:
+            fingerprints = [polydata_fingerprint(polydata)
+                            for polydata in polydata_list]
+            held = set(synced)
+            synced.clear()
+            synced.update(fingerprints)
+
+        def is_held(index):
+            return fingerprints is not None and fingerprints[index] in held
+
+        buffers = polydata_list_buffers(
+            [polydata for index, polydata in enumerate(polydata_list)
+             if not is_held(index)])
+        level = _compression_level(manager, buffers)
+        compact_cells = getattr(manager, 'compact_cells', False)
+        quantization_error = None
+        if trait_name == 'point_sets':
+            quantization_error = getattr(manager,
+                                         'point_set_quantization_error', None)
+
+        # The values are compressed concurrently once the structure of the
+        # output is known
+        to_compress = []
+
+        def compress_values(values, json_values):
+            to_compress.append((values, json_values))
 
         json = []
-        for polydata in polydata_list:
+        for index, polydata in enumerate(polydata_list):
+            if is_held(index):
+                json.append({'fingerprint': fingerprints[index]})
+                continue
             json_polydata = dict()
+            if fingerprints is not None:
+                json_polydata['fingerprint'] = fingerprints[index]
             for top_key, top_value in polydata.items():
                 if isinstance(top_value, dict):
                     nested_value_copy = dict()
@@ -395,16 +744,32 @@ def polydata_list_to_json(polydata_list, manager=None):  # noqa: C901
 
             if 'points' in json_polydata:
                 point_values = polydata['points']['values']
-                compressed = compressor.compress(point_values.data)
-                compressedView = memoryview(compressed)
-                json_polydata['points']['compressedValues'] = compressedView
+                if quantization_error is not None:
+                    quantized = quantize_points(point_values,
+                                                quantization_error)
+                    if quantized is not None:
+                        point_values, offset, scale = quantized
+                        json_polydata['points']['encodedDataType'] = \
+                            'Uint16Array'
+                        json_polydata['points']['quantization'] = {
+                            'offset': offset.tolist(),
+                            'scale': scale.tolist()
+                        }
+                compress_values(point_values, json_polydata['points'])
 
             for cell_type in ['verts', 'lines', 'polys', 'strips']:
                 if cell_type in json_polydata:
                     values = polydata[cell_type]['values']
-                    compressed = compressor.compress(values.data)
-                    compressedView = memoryview(compressed)
-                    json_polydata[cell_type]['compressedValues'] = compressedView
+                    json_cells = json_polydata[cell_type]
+                    if compact_cells and \
+                            json_cells['dataType'] in _cell_data_types:
+                        encoded = encode_cells(values)
+                        if encoded is not None:
+                            values, encodedDataType, cellSize = encoded
+                            json_cells['encodedDataType'] = encodedDataType
+                            if cellSize is not None:
+                                json_cells['cellSize'] = cellSize
+                    compress_values(values, json_cells)
 
             for data_type in ['pointData', 'cellData']:
                 if data_type in json_polydata:
@@ -420,14 +785,31 @@ def polydata_list_to_json(polydata_list, manager=None):  # noqa: C901
                             if not nested_key == 'values':
                                 compressed_array[nested_key] = nested_value
                         values = array['data']['values']
-                        compressed = compressor.compress(values.data)
-                        compressedView = memoryview(compressed)
-                        compressed_array['compressedValues'] = compressedView
+                        compress_values(values, compressed_array)
                         compressed_arrays.append({'data': compressed_array})
                     compressed_data['arrays'] = compressed_arrays
                     json_polydata[data_type] = compressed_data
 
             json.append(json_polydata)
+
+        chunk_size = _compression.CHUNK_SIZE
+        compressed_list = _compression.compress_many(
+            [values.data for values, _ in to_compress], level, chunk_size)
+        compressed_bytes = 0
+        for (_, json_values), compressed in zip(to_compress, compressed_list):
+            json_values['compressedValues'] = compressed
+            if isinstance(compressed, list):
+                json_values['chunkSize'] = chunk_size
+            if level is None:
+                json_values['compression'] = 'raw'
+            compressed_bytes += _compression.compressed_size(compressed)
+
+        adaptive = _adaptive_compression(manager)
+        if adaptive is not None and to_compress:
+            sequence = adaptive.record_sent(compressed_bytes)
+            for json_polydata in json:
+                if 'vtkClass' in json_polydata:
+                    json_polydata['sequence'] = sequence
         return json
 
 
@@ -447,20 +829,45 @@ def _type_to_numpy(jstype):
     return _js_to_numpy_dtype[jstype]
 
 
-def polydata_list_from_json(js, manager=None):  # noqa: C901
+def polydata_list_from_json(js, manager=None,  # noqa: C901
+                            trait_name=None):
     """Deserialize a Javascript vtk.js PolyData object.
 
-    Decompresses data buffers.
+    Decompresses data buffers. {'fingerprint': ...} stubs are resolved from
+    the current value of the trait_name trait of the manager.
     """
     if js is None:
         return None
     else:
-        decompressor = zstd.ZstdDecompressor()
+        current = dict()
+
+        def resolve_stub(fingerprint):
+            if not current and trait_name is not None:
+                for polydata in getattr(manager, trait_name, None) or []:
+                    current[polydata_fingerprint(polydata)] = polydata
+            if fingerprint not in current:
+                raise ValueError('Unknown geometry fingerprint: ' +
+                                 fingerprint)
+            return current[fingerprint]
+
+        def decompress(compressed, numberOfBytes, json_values):
+            return _compression.decompress(
+                compressed,
+                numberOfBytes,
+                json_values.get('chunkSize'),
+                compression=json_values.get('compression', 'zstd'))
 
         polydata_list = []
         for json_polydata in js:
+            if 'vtkClass' not in json_polydata and \
+                    'fingerprint' in json_polydata:
+                polydata_list.append(
+                    resolve_stub(json_polydata['fingerprint']))
+                continue
             polydata = dict()
             for top_key, top_value in json_polydata.items():
+                if top_key == 'fingerprint':
+                    continue
                 if isinstance(top_value, dict):
                     nested_value_copy = dict()
                     for nested_key, nested_value in top_value.items():
@@ -471,45 +878,52 @@ def polydata_list_from_json(js, manager=None):  # noqa: C901
                     polydata[top_key] = top_value
 
             if 'points' in polydata:
-                dtype = _type_to_numpy(polydata['points']['dataType'])
-                if six.PY2:
-                    asBytes = json_polydata['points']['compressedValues'].tobytes(
-                    )
-                    valuesBufferArrayCompressed = np.frombuffer(
-                        asBytes, dtype=np.uint8)
-                else:
-                    valuesBufferArrayCompressed = np.frombuffer(json_polydata['points']['compressedValues'],
-                                                                dtype=np.uint8)
+                points = polydata['points']
+                encodedDataType = points.pop('encodedDataType',
+                                             points['dataType'])
+                quantization = points.pop('quantization', None)
+                dtype = _type_to_numpy(encodedDataType)
+                valuesBufferArrayCompressed = _compressed_values(
+                    json_polydata['points']['compressedValues'])
                 numberOfBytes = json_polydata['points']['size'] * \
                     np.dtype(dtype).itemsize
                 valuesBufferArray = \
-                    np.frombuffer(decompressor.decompress(valuesBufferArrayCompressed,
-                                                          numberOfBytes),
+                    np.frombuffer(decompress(valuesBufferArrayCompressed,
+                                             numberOfBytes,
+                                             json_polydata['points']),
                                   dtype=dtype)
                 valuesBufferArray.shape = (
                     int(json_polydata['points']['size'] / 3), 3)
-                polydata['points']['values'] = valuesBufferArray
+                if quantization is not None:
+                    valuesBufferArray = dequantize_points(
+                        valuesBufferArray, quantization['offset'],
+                        quantization['scale'],
+                        _type_to_numpy(points['dataType']))
+                points['values'] = valuesBufferArray
 
             for cell_type in ['verts', 'lines', 'polys', 'strips']:
                 if cell_type in polydata:
-                    dtype = _type_to_numpy(polydata[cell_type]['dataType'])
-                    if six.PY2:
-                        asBytes = json_polydata[cell_type]['compressedValues'].tobytes(
-                        )
-                        valuesBufferArrayCompressed = np.frombuffer(
-                            asBytes, dtype=np.uint8)
-                    else:
-                        valuesBufferArrayCompressed = np.frombuffer(json_polydata[cell_type]['compressedValues'],
-                                                                    dtype=np.uint8)
+                    cells = polydata[cell_type]
+                    encodedDataType = cells.pop('encodedDataType',
+                                                cells['dataType'])
+                    cellSize = cells.pop('cellSize', None)
+                    dtype = _type_to_numpy(encodedDataType)
+                    valuesBufferArrayCompressed = _compressed_values(
+                        json_polydata[cell_type]['compressedValues'])
                     numberOfBytes = json_polydata[cell_type]['size'] * \
                         np.dtype(dtype).itemsize
                     valuesBufferArray = \
-                        np.frombuffer(decompressor.decompress(valuesBufferArrayCompressed,
-                                                              numberOfBytes),
+                        np.frombuffer(decompress(valuesBufferArrayCompressed,
+                                                 numberOfBytes,
+                                                 json_polydata[cell_type]),
                                       dtype=dtype)
                     valuesBufferArray.shape = (
                         json_polydata[cell_type]['size'],)
-                    polydata[cell_type]['values'] = valuesBufferArray
+                    if encodedDataType != cells['dataType']:
+                        valuesBufferArray = decode_cells(
+                            valuesBufferArray,
+                            _type_to_numpy(cells['dataType']), cellSize)
+                    cells['values'] = valuesBufferArray
 
             for data_type in ['pointData', 'cellData']:
                 if data_type in polydata:
@@ -525,19 +939,14 @@ def polydata_list_from_json(js, manager=None):  # noqa: C901
                             if not nested_key == 'compressedValues':
                                 decompressed_array[nested_key] = nested_value
                         dtype = _type_to_numpy(decompressed_array['dataType'])
-                        if six.PY2:
-                            asBytes = array['data']['compressedValues'].tobytes(
-                            )
-                            valuesBufferArrayCompressed = np.frombuffer(
-                                asBytes, dtype=np.uint8)
-                        else:
-                            valuesBufferArrayCompressed = np.frombuffer(array['data']['compressedValues'],
-                                                                        dtype=np.uint8)
+                        valuesBufferArrayCompressed = _compressed_values(
+                            array['data']['compressedValues'])
                         numberOfBytes = decompressed_array['size'] * \
                             np.dtype(dtype).itemsize
                         valuesBufferArray = \
-                            np.frombuffer(decompressor.decompress(valuesBufferArrayCompressed,
-                                                                  numberOfBytes),
+                            np.frombuffer(decompress(valuesBufferArrayCompressed,
+                                                     numberOfBytes,
+                                                     array['data']),
                                           dtype=dtype)
                         valuesBufferArray.shape = (decompressed_array['size'],)
                         decompressed_array['values'] = valuesBufferArray
@@ -556,6 +965,17 @@ polydata_list_serialization = {
 }
 
 
+def incremental_polydata_list_serialization(trait_name):
+    """Serializers for a polydata list trait that only send the entries the
+    browser does not hold yet."""
+    return {
+        'from_json': functools.partial(polydata_list_from_json,
+                                       trait_name=trait_name),
+        'to_json': functools.partial(polydata_list_to_json,
+                                     trait_name=trait_name)
+    }
+
+
 class PointSetList(PolyDataList):
     """A trait type holding a list of Python data structures compatible with vtk.js that
     is coerced from point set-like data structures."""
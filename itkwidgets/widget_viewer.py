@@ -7,16 +7,18 @@ In the future, will add optional segmentation mesh overlay.
 
 import colorcet
 import matplotlib
-import collections
-import functools
-import time
+import concurrent.futures
 
 import itk
 import numpy as np
 import ipywidgets as widgets
-from traitlets import CBool, CFloat, CInt, Unicode, CaselessStrEnum, List, validate, TraitError, Tuple
+from traitlets import CBool, CFloat, CInt, Unicode, CaselessStrEnum, List, Dict, Union, validate, TraitError, Tuple
 from ipydatawidgets import NDArray, array_serialization, shape_constraints
-from .trait_types import ITKImage, ImagePointTrait, ImagePoint, PointSetList, PolyDataList, itkimage_serialization, image_point_serialization, polydata_list_serialization, Colormap, LookupTable
+from .trait_types import ITKImage, ImagePointTrait, ImagePoint, PointSetList, PolyDataList, itkimage_serialization, itklabelimage_serialization, image_point_serialization, incremental_polydata_list_serialization, Colormap, LookupTable
+from ._compression import AdaptiveLevel, PayloadCache
+from ._lazy_image import LazyImage, MultiscaleImage, image_pyramid
+from ._scheduler import UpdateScheduler, running_loop
+from ._statistics import component_statistics, label_inventory
 
 try:
     import ipywebrtc
@@ -42,70 +44,33 @@ except ImportError:
 # from IPython.core.debugger import set_trace
 
 
-def get_ioloop():
-    import IPython
-    import zmq
-    ipython = IPython.get_ipython()
-    if ipython and hasattr(ipython, 'kernel'):
-        return zmq.eventloop.ioloop.IOLoop.instance()
+_render_executor = None
 
 
-def debounced(delay_seconds=0.5, method=False):
-    def wrapped(f):
-        counters = collections.defaultdict(int)
+def get_render_executor():
+    """The executor that computes rendered images in the background.
 
-        @functools.wraps(f)
-        def execute(*args, **kwargs):
-            if method:  # if it is a method, we want to have a counter per instance
-                key = args[0]
-            else:
-                key = None
-            counters[key] += 1
-
-            def debounced_execute(counter=counters[key]):
-                # only execute if the counter wasn't changed in the meantime
-                if counter == counters[key]:
-                    f(*args, **kwargs)
-            ioloop = get_ioloop()
-
-            def thread_safe():
-                ioloop.add_timeout(
-                    time.time() + delay_seconds,
-                    debounced_execute)
-
-            # we live outside of IPython (e.g. unittest), so execute directly
-            if ioloop is None:
-                debounced_execute()
-            else:
-                ioloop.add_callback(thread_safe)
-        return execute
-    return wrapped
+    A single worker computes one render at a time, in order, so the ITK
+    pipelines of a viewer are never updated concurrently."""
+    global _render_executor
+    if _render_executor is None:
+        _render_executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+    return _render_executor
 
-# https://ipywidgets.readthedocs.io/en/stable/examples/Widget%20Asynchronous.html
 
+_pyramid_executor = None
 
-def yield_for_change(widget, attribute):
-    """Pause a generator to wait for a widget change event.
 
-    This is a decorator for a generator function which pauses the generator on yield
-    until the given widget attribute changes. The new value of the attribute is
-    sent to the generator and is the value of the yield.
-    """
-    def f(iterator):
-        @functools.wraps(iterator)
-        def inner():
-            i = iterator()
-
-            def next_i(change):
-                try:
-                    i.send(change.new)
-                except StopIteration:
-                    widget.unobserve(next_i, attribute)
-            widget.observe(next_i, attribute)
-            # start the generator
-            next(i)
-        return inner
-    return f
+def get_pyramid_executor():
+    """The executor that builds multiscale pyramids in the background.
+
+    It is separate from the shared executor, which the pyramid construction
+    uses for chunked computations."""
+    global _pyramid_executor
+    if _pyramid_executor is None:
+        _pyramid_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    return _pyramid_executor
+
 
 
 @widgets.register
@@ -120,7 +85,10 @@ class Viewer(ViewerParent):
     image = ITKImage(
         default_value=None,
         allow_none=True,
-        help="Image to visualize.").tag(
+        help="Image to visualize. Call Modified() on an itk.Image after "
+        "editing its pixels in place, e.g. through array_view_from_image; "
+        "otherwise, edits that are not sampled by the payload cache are not "
+        "sent.").tag(
         sync=False,
         **itkimage_serialization)
     rendered_image = ITKImage(
@@ -134,14 +102,15 @@ class Viewer(ViewerParent):
     label_image = ITKImage(
         default_value=None,
         allow_none=True,
-        help="Label map for the image.").tag(
+        help="Label map for the image. Call Modified() on an itk.Image "
+        "after editing its pixels in place.").tag(
         sync=False,
-        **itkimage_serialization)
+        **itklabelimage_serialization)
     rendered_label_image = ITKImage(
         default_value=None,
         allow_none=True).tag(
         sync=True,
-        **itkimage_serialization)
+        **itklabelimage_serialization)
     label_image_names = List(
         allow_none=True,
         default_value=None,
@@ -241,10 +210,20 @@ class Viewer(ViewerParent):
                             help="Size limit for 2D image visualization.").tag(sync=False)
     size_limit_3d = NDArray(dtype=np.int64, default_value=np.array([192, 192, 192], dtype=np.int64),
                             help="Size limit for 3D image visualization.").tag(sync=False)
+    size_limit_bytes = CInt(default_value=None, allow_none=True,
+                            help="Size limit, in bytes, of the rendered image "
+                            "and label image. Overrides the per axis size "
+                            "limits.").tag(sync=False)
     sample_distance = CFloat(default_value=0.25,
                             help="Normalized volume rendering sample distance.").tag(sync=True)
     _scale_factors = NDArray(dtype=np.uint8, default_value=np.array([1, 1, 1], dtype=np.uint8),
                              help="Image downscaling factors.").tag(sync=True, **array_serialization)
+    _streamed_slice = Dict(
+        default_value=None,
+        allow_none=True,
+        help="In slice streaming, the index of the streamed slice, the number "
+        "of slices of the image along its axis, and the world positions of "
+        "the first and last slice.").tag(sync=True)
     _downsampling = CBool(default_value=False,
                           help="We are downsampling the image to meet the size limits.").tag(sync=True)
     _reset_crop_requested = CBool(default_value=False,
@@ -262,7 +241,7 @@ class Viewer(ViewerParent):
         allow_none=True,
         help="Point sets to visualize").tag(
         sync=True,
-        **polydata_list_serialization)
+        **incremental_polydata_list_serialization('point_sets'))
     point_set_colors = NDArray(dtype=np.float32, default_value=np.zeros((0, 3), dtype=np.float32),
                                help="RGB colors for the points sets")\
         .tag(sync=True, **array_serialization)\
@@ -279,12 +258,21 @@ class Viewer(ViewerParent):
         default_value=[],
         help="Point set representation").tag(
         trait=Unicode(), sync=True)
+    compact_cells = CBool(
+        default_value=True,
+        help="Send the connectivity of geometries and point sets with 16-bit "
+        "integers when possible, and delta coded.").tag(sync=False)
+    point_set_quantization_error = CFloat(
+        default_value=None,
+        allow_none=True,
+        help="Largest error allowed to send point set coordinates quantized "
+        "to 16 bits.").tag(sync=False)
     geometries = PolyDataList(
         default_value=None,
         allow_none=True,
         help="Geometries to visualize").tag(
         sync=True,
-        **polydata_list_serialization)
+        **incremental_polydata_list_serialization('geometries'))
     geometry_colors = NDArray(dtype=np.float32, default_value=np.zeros((0, 3), dtype=np.float32),
                               help="RGB colors for the geometries")\
         .tag(sync=True, **array_serialization)\
@@ -323,6 +311,44 @@ class Viewer(ViewerParent):
         allow_none=True,
         default_value=(),
         help="Background color.").tag(trait=CFloat(), sync=True)
+    roi_cache_size = CInt(
+        default_value=256 * 1024 * 1024,
+        help="Maximum number of bytes of rendered regions of interest kept "
+        "to be sent again without recomputing them.").tag(sync=False)
+    progressive = CBool(
+        default_value=False,
+        help="Send a coarse preview of large images before the full "
+        "resolution image.").tag(sync=False)
+    progressive_factor = CInt(
+        default_value=4,
+        help="Factor by which the preview size limits are smaller than the "
+        "size limits in progressive mode.").tag(sync=False)
+    slice_streaming = CBool(
+        default_value=False,
+        help="In the x, y and z view modes, send the slice of the roi at the "
+        "slicing plane, within the 2D size limits, instead of the downsampled "
+        "volume.").tag(sync=False)
+    slice_prefetch = CInt(
+        default_value=2,
+        help="Number of neighbouring slices on each side of the slicing plane "
+        "rendered ahead in slice streaming.").tag(sync=False)
+    compression_level = Union([CInt(), CaselessStrEnum(('auto',))],
+        default_value=3,
+        help="zstd compression level for image and geometry data, or 'auto' to "
+        "select the level with the lowest transfer latency.").tag(sync=True)
+    compression_shuffle = CaselessStrEnum(
+        ('none', 'byte', 'bit'),
+        default_value='none',
+        help="Shuffle the bytes or bits of image pixels by significance before compression.").tag(sync=False)
+    narrow_integer_types = CBool(
+        default_value=False,
+        help="Send integer images with the smallest integer type that holds "
+        "their values.").tag(sync=False)
+    _transfer_statistics = Dict(
+        default_value=None,
+        allow_none=True,
+        help="Size and decompression time of the last payload received by the "
+        "browser.").tag(sync=True)
 
     def __init__(self, **kwargs):  # noqa: C901
         if 'point_set_colors' in kwargs:
@@ -364,6 +390,39 @@ class Viewer(ViewerParent):
             vmax_list = self._validate_vmax(proposal)
             kwargs['vmax'] = vmax_list
         self.observe(self._on_geometries_changed, ['geometries'])
+        self._adaptive_compression = AdaptiveLevel()
+        # Fingerprints of the point sets and geometries the browser holds
+        self._synced_fingerprints = dict()
+        # Multiscale pyramids of the image and label image, built in the
+        # background, that roi changes are served from
+        self._pyramids = dict()
+        # Rendered images and label images, keyed by their region and scale
+        # factors
+        self._roi_cache = PayloadCache(self.roi_cache_size)
+        # The image and the statistics of its pixels, sent with its rendered
+        # images
+        self._statistics = None
+        # Label inventories, keyed by the label image buffer and modification
+        # time
+        self._label_inventories = PayloadCache(16 * 1024 * 1024)
+        # Renders are numbered so superseded results are discarded
+        self._render_generation = 0
+        self._render_future = None
+        # roi and image changes are coalesced and throttled, and once the
+        # viewer is displayed, a render is only started after the browser
+        # rendered the previous one
+        self._render_scheduler = UpdateScheduler(
+            self, Viewer._update_rendered_image)
+        if hasattr(self, 'on_displayed'):
+            # ipywidgets < 8
+            self.on_displayed(lambda widget, **kwargs: widget._on_displayed())
+        self._reset_rendered = False
+        # The (axis, index) of the last slice rendered in slice streaming
+        self._rendered_plane = None
+        self.observe(self._on_rendering_image_changed, ['_rendering_image'])
+        self.observe(self._on_roi_cache_size_changed, ['roi_cache_size'])
+        self.observe(self._on_transfer_statistics,
+                     ['_transfer_statistics'])
         have_label_image = 'label_image' in kwargs and kwargs['label_image'] is not None
         if have_label_image:
             # Interpolation is not currently supported with label maps
@@ -387,39 +446,88 @@ class Viewer(ViewerParent):
         self._largest_roi_rendered_label_image = None
         self._largest_roi = np.zeros((2, 3), dtype=np.float64)
         if not np.any(self.roi):
+            # Do not modify the default value, which is shared by all viewers
+            roi = self.roi.copy()
             largest_index = largest_region.GetIndex()
-            self.roi[0][:dimension] = np.array(
+            roi[0][:dimension] = np.array(
                 image.TransformIndexToPhysicalPoint(largest_index))
             largest_index_upper = largest_index + size
-            self.roi[1][:dimension] = np.array(
+            roi[1][:dimension] = np.array(
                 image.TransformIndexToPhysicalPoint(largest_index_upper))
+            self.roi = roi
             self._largest_roi = self.roi.copy()
 
-        if dimension == 2:
-            for dim in range(dimension):
-                if size[dim] > self.size_limit_2d[dim]:
-                    self._downsampling = True
-        else:
-            for dim in range(dimension):
-                if size[dim] > self.size_limit_3d[dim]:
-                    self._downsampling = True
-        if self._downsampling and self.image:
-            self.extractor = itk.ExtractImageFilter.New(self.image)
-            self.shrinker = itk.BinShrinkImageFilter.New(self.extractor)
-        if self._downsampling and self.label_image:
-            self.label_image_extractor = itk.ExtractImageFilter.New(self.label_image)
-            self.label_image_shrinker = itk.ShrinkImageFilter.New(self.label_image_extractor)
-        self._update_rendered_image()
+        scale_factors = self._find_roi_scale_factors(image, size)
+        if any(factor > 1 for factor in scale_factors):
+            self._downsampling = True
+        # The first image is rendered before the viewer is displayed
+        self._update_rendered_image(synchronous=True)
         if self._downsampling:
             self.observe(self._on_roi_changed, ['roi'])
+            self.observe(self._on_mode_changed, ['mode'])
+            self.observe(self._on_slice_changed,
+                         ['x_slice', 'y_slice', 'z_slice'])
 
         self.observe(self._on_reset_crop_requested, ['_reset_crop_requested'])
         self.observe(self.update_rendered_image, ['image', 'label_image'])
         self.observe(self.update_rendered_image, ['image', 'label_image'])
 
+    def get_state(self, key=None, drop_defaults=False):
+        if key is None:
+            # The full state is sent to a new front-end, which does not hold
+            # any point sets or geometries
+            self._synced_fingerprints.clear()
+        return super(Viewer, self).get_state(key=key,
+                                             drop_defaults=drop_defaults)
+
+    def _on_transfer_statistics(self, change=None):
+        statistics = change.new
+        if statistics:
+            self._adaptive_compression.record_received(
+                statistics['compressedBytes'],
+                statistics['decompressedBytes'],
+                statistics['duration'] / 1000.0,
+                statistics.get('sequence'))
+
+    def _on_roi_cache_size_changed(self, change=None):
+        self._roi_cache.clear()
+        self._roi_cache.max_bytes = change.new
+
+    def roi_cache_info(self):
+        """Hits, misses, entries and bytes of the cache of rendered regions of
+        interest."""
+        return self._roi_cache.info()
+
     def _on_roi_changed(self, change=None):
         if self._downsampling:
-            self._update_rendered_image()
+            self._render_scheduler.request()
+
+    def _on_mode_changed(self, change=None):
+        if self.slice_streaming:
+            self._render_scheduler.request()
+
+    def _on_slice_changed(self, change=None):
+        if not self.slice_streaming or self.mode != change.name[0]:
+            return
+        # The browser also reports the position of the slice it was sent
+        if self._streamed_plane(self.roi) != self._rendered_plane:
+            self._render_scheduler.request()
+
+    def _on_rendering_image_changed(self, change=None):
+        if change.new is False:
+            self._render_scheduler.acknowledge()
+
+    def _on_displayed(self):
+        # Views acknowledge the renders they receive
+        self._render_scheduler.acknowledged = True
+
+    def _repr_mimebundle_(self, **kwargs):
+        self._on_displayed()
+        return super(Viewer, self)._repr_mimebundle_(**kwargs)
+
+    def close(self):
+        self._render_scheduler.close()
+        super(Viewer, self).close()
 
     def _on_reset_crop_requested(self, change=None):
         if change.new is True and self._downsampling:
@@ -442,12 +550,12 @@ class Viewer(ViewerParent):
         if change.new is True:
             self._reset_crop_requested = False
 
-    @debounced(delay_seconds=0.2, method=True)
     def update_rendered_image(self, change=None):
-        self._largest_roi_rendered_image = None
-        self._largest_roi_rendered_label_image = None
         self._largest_roi = np.zeros((2, 3), dtype=np.float64)
-        self._update_rendered_image()
+        # The rendered images of the previous image are dropped by the next
+        # render, after renders of the previous image complete
+        self._reset_rendered = True
+        self._render_scheduler.request()
 
     @staticmethod
     def _find_scale_factors(limit, dimension, size):
@@ -457,17 +565,249 @@ class Viewer(ViewerParent):
                 scale_factors[dim] += 1
         return scale_factors
 
-    def _update_rendered_image(self):
+    @staticmethod
+    def _find_budget_scale_factors(budget, dimension, size, pixel_bytes,
+                                   spacing):
+        """Scale factors that fit the image in a byte budget.
+
+        The axis with the finest spacing, after scaling, is coarsened first,
+        so the rendered image is as isotropic as the budget allows."""
+        scale_factors = [1, ] * 3
+
+        def nbytes():
+            pixels = 1
+            for dim in range(dimension):
+                pixels *= max(1, size[dim] // scale_factors[dim])
+            return pixels * pixel_bytes
+        while nbytes() > budget:
+            axes = [dim for dim in range(dimension)
+                    if size[dim] // scale_factors[dim] > 1]
+            if not axes:
+                break
+            coarsened = min(axes, key=lambda dim: (
+                spacing[dim] * scale_factors[dim],
+                -(size[dim] // scale_factors[dim])))
+            scale_factors[coarsened] += 1
+        return scale_factors
+
+    @staticmethod
+    def _pixel_bytes(image):
+        """Number of bytes of a pixel of the rendered image."""
+        if isinstance(image, LazyImage):
+            itemsize = image.array.dtype.itemsize
+        else:
+            itemsize = itk.array_view_from_image(image).itemsize
+        return itemsize * image.GetNumberOfComponentsPerPixel()
+
+    def _find_roi_scale_factors(self, image, size, axis=None):
+        """Scale factors of a region of the given size of the image, or the
+        label image, that meet the size limits.
+
+        With axis, the region is a slice normal to the axis, which is limited
+        like a 2D image."""
+        dims = list(range(image.GetImageDimension()))
+        if axis is not None:
+            dims.remove(axis)
+        dimension = len(dims)
+        size = [size[dim] for dim in dims]
+        if self.size_limit_bytes is not None:
+            # The image and the label image are rendered on the same grid
+            pixel_bytes = 0
+            for rendered in (self.image, self.label_image):
+                if rendered is not None:
+                    pixel_bytes += self._pixel_bytes(rendered)
+            spacing = image.GetSpacing()
+            factors = self._find_budget_scale_factors(
+                self.size_limit_bytes, dimension, size, pixel_bytes,
+                [spacing[dim] for dim in dims])
+        elif dimension == 2:
+            factors = self._find_scale_factors(self.size_limit_2d, dimension, size)
+        else:
+            factors = self._find_scale_factors(self.size_limit_3d, dimension, size)
+        scale_factors = [1, ] * 3
+        for dim, factor in zip(dims, factors):
+            scale_factors[dim] = factor
+        return scale_factors
+
+    def _progressive_preview(self, label, region, scale_factors):
+        """A coarse version of the region of the image, or the label image,
+        shrunk by the scale factors, that is sent before it in progressive
+        mode.
+
+        The preview is read from the coarse levels of the multiscale pyramid,
+        so it is None until the pyramid is built, or if the rendered region is
+        small."""
+        image = self.label_image if label else self.image
+        if isinstance(image, MultiscaleImage):
+            pyramid = image
+        elif isinstance(image, LazyImage):
+            return None
+        else:
+            pyramid = self._pyramid(label)
+        if pyramid is None:
+            return None
+        dimension = image.GetImageDimension()
+        size = [max(1, region.GetSize()[dim] // scale_factors[dim])
+                for dim in range(dimension)]
+        if self.size_limit_bytes is not None:
+            budget = self.size_limit_bytes // self.progressive_factor ** dimension
+            spacing = image.GetSpacing()
+            preview_factors = self._find_budget_scale_factors(
+                budget, dimension, size, self._pixel_bytes(image),
+                [spacing[dim] * scale_factors[dim] for dim in range(dimension)])
+        else:
+            if dimension == 2:
+                limit = self.size_limit_2d // self.progressive_factor
+            else:
+                limit = self.size_limit_3d // self.progressive_factor
+            limit = np.maximum(limit, 1)
+            preview_factors = self._find_scale_factors(limit, dimension, size)
+        if all(factor == 1 for factor in preview_factors):
+            return None
+        preview_factors = [scale_factor * factor for scale_factor, factor
+                           in zip(scale_factors, preview_factors)]
+        return pyramid.extract(region, preview_factors[:dimension],
+                               label=label)
+
+    def _update_rendered_image(self, synchronous=False):
         if self.image is None and self.label_image is None:
             return
-        if self._rendering_image:
-            @yield_for_change(self, '_rendering_image')
-            def f():
-                x = yield
-                assert(x is False)
-            f()
         self._rendering_image = True
 
+        # Supersede pending and running renders
+        self._render_generation += 1
+        generation = self._render_generation
+        if self._render_future is not None:
+            self._render_future.cancel()
+        roi = self.roi.copy()
+        reset = self._reset_rendered
+        self._reset_rendered = False
+        plane = self._streamed_plane(roi)
+        self._rendered_plane = plane
+        loop = running_loop()
+        executor = get_render_executor()
+        # Previews of the roi are sent first in progressive mode, except in
+        # the initial render
+        previews = self.progressive and not synchronous and not reset and \
+            plane is None and self._downsampling
+        # we live outside of an event loop (e.g. unittest), so render directly
+        if loop is None or synchronous:
+            if previews:
+                self._assign_previews(generation,
+                                      self._render_previews(generation, roi))
+            self._assign_rendered(generation,
+                                  self._render(generation, roi, reset, plane))
+        else:
+            if previews:
+                # The render executor has a single worker, so the previews
+                # are assigned before the full resolution images
+                preview_future = executor.submit(self._render_previews,
+                                                 generation, roi)
+
+                def previewed(future):
+                    loop.call_soon_threadsafe(self._assign_previews,
+                                              generation, future)
+                preview_future.add_done_callback(previewed)
+            future = executor.submit(self._render, generation, roi, reset,
+                                     plane)
+            self._render_future = future
+
+            def rendered(future):
+                loop.call_soon_threadsafe(self._assign_rendered, generation,
+                                          future)
+            future.add_done_callback(rendered)
+        if plane is not None:
+            if loop is None:
+                self._prefetch_slices(generation, roi, plane)
+            else:
+                executor.submit(self._prefetch_slices, generation, roi, plane)
+
+    def _assign_rendered(self, generation, rendered):
+        """Assign the result of a render unless it was superseded.
+
+        The browser does not render when the render failed, or did not change
+        the rendered images, so _rendering_image is cleared here instead."""
+        if generation != self._render_generation:
+            # Cancelled, or superseded by a render that assigns its result
+            return
+        if isinstance(rendered, concurrent.futures.Future):
+            try:
+                rendered = rendered.result()
+            except Exception:
+                self.log.exception('Rendering the image failed')
+                rendered = None
+        changed = False
+        for name, value in rendered or []:
+            if name in ('rendered_image', 'rendered_label_image'):
+                changed = changed or getattr(self, name) is not value
+            setattr(self, name, value)
+        if not changed:
+            self._rendering_image = False
+
+    def _assign_previews(self, generation, previews):
+        """Assign the progressive previews of a render unless it was
+        superseded.
+
+        The browser acknowledges the full resolution images that follow, so
+        _rendering_image is not cleared here."""
+        if generation != self._render_generation:
+            return
+        if isinstance(previews, concurrent.futures.Future):
+            try:
+                previews = previews.result()
+            except Exception:
+                self.log.exception('Rendering the preview failed')
+                return
+        for name, value in previews or []:
+            setattr(self, name, value)
+
+    def _render_previews(self, generation, roi):
+        """Compute coarse previews of the rendered image and label image of
+        the roi, so the browser can render them while the full resolution
+        images are computed and transferred.
+
+        Returns the (name, value) trait assignments, or None if the render was
+        superseded."""
+        if generation != self._render_generation:
+            return None
+        if self.image:
+            image = self.image
+        else:
+            image = self.label_image
+        dimension = image.GetImageDimension()
+        index = image.TransformPhysicalPointToIndex(roi[0][:dimension])
+        upper_index = image.TransformPhysicalPointToIndex(roi[1][:dimension])
+        region = self._padded_region(image, roi)
+        scale_factors = self._find_roi_scale_factors(image,
+                                                     upper_index - index)
+        previews = []
+        for label, name in ((False, 'rendered_image'),
+                            (True, 'rendered_label_image')):
+            if not getattr(self, 'label_image' if label else 'image'):
+                continue
+            preview = self._progressive_preview(label, region, scale_factors)
+            if preview is None:
+                continue
+            preview = self._placed(preview, roi[0][:dimension])
+            if not label:
+                preview._statistics = self._image_statistics()
+            preview._preview = True
+            previews.append((name, preview))
+        return previews
+
+    def _render(self, generation, roi, reset=False, plane=None):
+        """Compute the rendered image and label image for the roi, or for its
+        slice at the (axis, index) plane, after dropping the rendered images
+        of a previous image on reset.
+
+        Returns the (name, value) trait assignments, or None if the render was
+        superseded."""
+        if reset:
+            self._pyramids.clear()
+            self._roi_cache.clear()
+            self._largest_roi_rendered_image = None
+            self._largest_roi_rendered_label_image = None
+        rendered = []
         if self._downsampling:
             if self.image:
                 image = self.image
@@ -475,84 +815,328 @@ class Viewer(ViewerParent):
                 image = self.label_image
             dimension = image.GetImageDimension()
             index = image.TransformPhysicalPointToIndex(
-                self.roi[0][:dimension])
+                roi[0][:dimension])
             upper_index = image.TransformPhysicalPointToIndex(
-                self.roi[1][:dimension])
+                roi[1][:dimension])
             size = upper_index - index
+            region = self._padded_region(image, roi)
+            if plane is not None:
+                return self._render_slice(generation, image, region, plane)
 
-            if dimension == 2:
-                scale_factors = self._find_scale_factors(
-                    self.size_limit_2d, dimension, size)
-            else:
-                scale_factors = self._find_scale_factors(
-                    self.size_limit_3d, dimension, size)
-            self._scale_factors = np.array(scale_factors, dtype=np.uint8)
-            if self.image:
-                self.shrinker.SetShrinkFactors(scale_factors[:dimension])
-            if self.label_image:
-                self.label_image_shrinker.SetShrinkFactors(scale_factors[:dimension])
-
-            region = itk.ImageRegion[dimension]()
-            region.SetIndex(index)
-            region.SetSize(tuple(size))
-            # Account for rounding
-            # truncation issues
-            region.PadByRadius(1)
-            region.Crop(image.GetLargestPossibleRegion())
-
-            if self.image:
-                self.extractor.SetInput(self.image)
-                self.extractor.SetExtractionRegion(region)
-            if self.label_image:
-                self.label_image_extractor.SetInput(self.label_image)
-                self.label_image_extractor.SetExtractionRegion(region)
-
-            size = region.GetSize()
+            scale_factors = self._find_roi_scale_factors(image, size)
+            rendered.append(('_scale_factors',
+                             np.array(scale_factors, dtype=np.uint8)))
+            rendered.append(('_streamed_slice', None))
 
             is_largest = False
             if np.any(self._largest_roi) and np.all(
-                    self._largest_roi == self.roi):
+                    self._largest_roi == roi):
                 is_largest = True
                 if self._largest_roi_rendered_image is not None or self._largest_roi_rendered_label_image is not None:
                     if self.image:
-                        self.rendered_image = self._largest_roi_rendered_image
+                        self._largest_roi_rendered_image._statistics = \
+                            self._image_statistics()
+                        rendered.append(('rendered_image', self._largest_roi_rendered_image))
                     if self.label_image:
-                        self.rendered_label_image = self._largest_roi_rendered_label_image
-                    return
+                        rendered.append(('rendered_label_image', self._largest_roi_rendered_label_image))
+                    return rendered
 
             if self.image:
-                self.shrinker.UpdateLargestPossibleRegion()
+                shrunk = self._placed(
+                    self._rendered_region(False, region, scale_factors),
+                    roi[0][:dimension])
+                shrunk._statistics = self._image_statistics()
+                if is_largest:
+                    self._largest_roi_rendered_image = shrunk
+                rendered.append(('rendered_image', shrunk))
+            if generation != self._render_generation:
+                return None
             if self.label_image:
-                self.label_image_shrinker.UpdateLargestPossibleRegion()
-            if is_largest:
-                if self.image:
-                    self._largest_roi_rendered_image = self.shrinker.GetOutput()
-                    self._largest_roi_rendered_image.DisconnectPipeline()
-                    self._largest_roi_rendered_image.SetOrigin(
-                        self.roi[0][:dimension])
-                    self.rendered_image = self._largest_roi_rendered_image
-                if self.label_image:
-                    self._largest_roi_rendered_label_image = self.label_image_shrinker.GetOutput()
-                    self._largest_roi_rendered_label_image.DisconnectPipeline()
-                    self._largest_roi_rendered_label_image.SetOrigin(
-                        self.roi[0][:dimension])
-                    self.rendered_label_image = self._largest_roi_rendered_label_image
-                return
-            if self.image:
-                shrunk = self.shrinker.GetOutput()
-                shrunk.DisconnectPipeline()
-                shrunk.SetOrigin(self.roi[0][:dimension])
-                self.rendered_image = shrunk
-            if self.label_image:
-                shrunk = self.label_image_shrinker.GetOutput()
-                shrunk.DisconnectPipeline()
-                shrunk.SetOrigin(self.roi[0][:dimension])
-                self.rendered_label_image = shrunk
+                shrunk = self._placed(
+                    self._rendered_region(True, region, scale_factors),
+                    roi[0][:dimension])
+                if is_largest:
+                    self._largest_roi_rendered_label_image = shrunk
+                rendered.append(('rendered_label_image', shrunk))
         else:
             if self.image:
-                self.rendered_image = self.image
+                computed = self._computed(self.image)
+                if isinstance(self.image, LazyImage):
+                    computed._statistics = self._image_statistics()
+                rendered.append(('rendered_image', computed))
             if self.label_image:
-                self.rendered_label_image = self.label_image
+                rendered.append(('rendered_label_image',
+                                 self._computed(self.label_image, label=True)))
+        return rendered
+
+    @staticmethod
+    def _padded_region(image, roi):
+        """The region of the image covered by the roi."""
+        dimension = image.GetImageDimension()
+        index = image.TransformPhysicalPointToIndex(roi[0][:dimension])
+        upper_index = image.TransformPhysicalPointToIndex(roi[1][:dimension])
+        region = itk.ImageRegion[dimension]()
+        region.SetIndex(index)
+        region.SetSize(tuple(upper_index - index))
+        # Account for rounding
+        # truncation issues
+        region.PadByRadius(1)
+        region.Crop(image.GetLargestPossibleRegion())
+        return region
+
+    @staticmethod
+    def _slice_region(region, axis, index):
+        """The slice of the region normal to the axis at the index."""
+        slice_index = list(region.GetIndex())
+        slice_index[axis] = index
+        slice_size = list(region.GetSize())
+        slice_size[axis] = 1
+        slice_region = itk.ImageRegion[3]()
+        slice_region.SetIndex(slice_index)
+        slice_region.SetSize(slice_size)
+        return slice_region
+
+    def _streamed_plane(self, roi):
+        """The (axis, index) of the slice of the roi sent instead of the
+        volume in slice streaming, or None if the volume is sent."""
+        if not self.slice_streaming or self.mode == 'v' or \
+                not self._downsampling:
+            return None
+        if self.image:
+            image = self.image
+        else:
+            image = self.label_image
+        if image.GetImageDimension() != 3:
+            return None
+        axis = 'xyz'.index(self.mode)
+        point = (roi[0] + roi[1]) / 2.0
+        position = getattr(self, self.mode + '_slice')
+        if position is not None:
+            point[axis] = position
+        index = image.TransformPhysicalPointToIndex(point)[axis]
+        # Slices of the whole image are streamed, so the slider in the
+        # browser spans the volume
+        largest_region = image.GetLargestPossibleRegion()
+        lower = largest_region.GetIndex()[axis]
+        upper = lower + largest_region.GetSize()[axis] - 1
+        return (axis, int(min(max(index, lower), upper)))
+
+    def _render_slice(self, generation, image, region, plane):
+        """Compute the rendered image and label image of the slice of the
+        region at the (axis, index) plane."""
+        axis, index = plane
+        region = self._slice_region(region, axis, index)
+        scale_factors = self._find_roi_scale_factors(image, region.GetSize(),
+                                                     axis=axis)
+        rendered = [('_scale_factors', np.array(scale_factors, dtype=np.uint8)),
+                    ('_streamed_slice', self._slice_extent(image, region, axis))]
+        if self.image:
+            shrunk = self._zero_index(
+                self._rendered_region(False, region, scale_factors))
+            shrunk._statistics = self._image_statistics()
+            rendered.append(('rendered_image', shrunk))
+        if generation != self._render_generation:
+            return None
+        if self.label_image:
+            shrunk = self._zero_index(
+                self._rendered_region(True, region, scale_factors))
+            rendered.append(('rendered_label_image', shrunk))
+        return rendered
+
+    @staticmethod
+    def _slice_extent(image, region, axis):
+        """The index of the slice region along the axis, the number of slices
+        of the image, and the world positions of its first and last slice, for
+        the slider of the browser."""
+        largest_region = image.GetLargestPossibleRegion()
+        index = list(region.GetIndex())
+        lower = largest_region.GetIndex()[axis]
+        size = largest_region.GetSize()[axis]
+        positions = []
+        for slice_index in (lower, lower + size - 1):
+            index[axis] = slice_index
+            point = image.TransformIndexToPhysicalPoint(index)
+            positions.append(float(point[axis]))
+        return {'index': int(region.GetIndex()[axis] - lower),
+                'size': int(size),
+                'positions': positions}
+
+    def _zero_index(self, image):
+        """A new image that shares the pixels of image, with the index of its
+        buffered region, which is not sent to the browser, moved into its
+        origin."""
+        region = image.GetBufferedRegion()
+        index = region.GetIndex()
+        if not any(index):
+            return image
+        placed = self._placed(image, image.TransformIndexToPhysicalPoint(index))
+        region = placed.GetBufferedRegion()
+        region.SetIndex([0, ] * image.GetImageDimension())
+        placed.SetRegions(region)
+        return placed
+
+    def _prefetch_slices(self, generation, roi, plane):
+        """Render the neighbouring slices of the plane into the cache of
+        rendered regions of interest, nearest first, until superseded."""
+        if self.image:
+            image = self.image
+        else:
+            image = self.label_image
+        region = self._padded_region(image, roi)
+        axis, index = plane
+        largest_region = image.GetLargestPossibleRegion()
+        lower = largest_region.GetIndex()[axis]
+        upper = lower + largest_region.GetSize()[axis]
+        for offset in range(1, self.slice_prefetch + 1):
+            for neighbour in (index + offset, index - offset):
+                if generation != self._render_generation:
+                    return
+                if not lower <= neighbour < upper:
+                    continue
+                slice_region = self._slice_region(region, axis, neighbour)
+                scale_factors = self._find_roi_scale_factors(
+                    image, slice_region.GetSize(), axis=axis)
+                if self.image:
+                    self._rendered_region(False, slice_region, scale_factors)
+                if self.label_image:
+                    self._rendered_region(True, slice_region, scale_factors)
+
+    @staticmethod
+    def _placed(image, origin):
+        """A new image that shares the pixels of image, at origin.
+
+        Images in the cache of rendered regions of interest are not
+        modified."""
+        placed = type(image).New()
+        placed.Graft(image)
+        placed.SetOrigin(origin)
+        return placed
+
+    def _rendered_region(self, label, region, scale_factors):
+        """The shrunk region of the image, or the label image, from the cache
+        of rendered regions of interest if it was rendered before."""
+        key = (label, tuple(region.GetIndex()), tuple(region.GetSize()),
+               tuple(scale_factors))
+        shrunk = self._roi_cache.get(key)
+        if shrunk is None:
+            shrunk = self._shrink(label, region, scale_factors)
+            self._roi_cache.put(key, shrunk,
+                                itk.array_view_from_image(shrunk).nbytes)
+        return shrunk
+
+    def _shrink(self, label, region, scale_factors):
+        """Extract the region of the image, or the label image, and shrink it
+        by the scale factors.
+
+        Only the result is computed for lazily evaluated images."""
+        if label:
+            image = self.label_image
+        else:
+            image = self.image
+        dimension = image.GetImageDimension()
+        if isinstance(image, LazyImage):
+            return image.extract(region, scale_factors[:dimension], label=label)
+        pyramid = self._pyramid(label)
+        if pyramid is not None:
+            return pyramid.extract(region, scale_factors[:dimension], label=label)
+        if label and not any(image.GetLargestPossibleRegion().GetIndex()):
+            # Bins take their most frequent non-zero label, so small and thin
+            # labels stay visible
+            labels = LazyImage(itk.array_view_from_image(image),
+                               spacing=image.GetSpacing(),
+                               origin=image.GetOrigin(),
+                               direction=image.GetDirection())
+            return labels.extract(region, scale_factors[:dimension], label=True)
+        extractor, shrinker = self._shrink_filters(label, image)
+        extractor.SetInput(image)
+        extractor.SetExtractionRegion(region)
+        shrinker.SetShrinkFactors(scale_factors[:dimension])
+        shrinker.UpdateLargestPossibleRegion()
+        shrunk = shrinker.GetOutput()
+        shrunk.DisconnectPipeline()
+        return shrunk
+
+    def _shrink_filters(self, label, image):
+        """The extract and shrink filters of the image, or the label image,
+        created on first use and when the type of the image changes, e.g.
+        when a lazily evaluated image is replaced by an itk.Image."""
+        if label:
+            names = ('label_image_extractor', 'label_image_shrinker')
+            shrink_filter = itk.ShrinkImageFilter
+        else:
+            names = ('extractor', 'shrinker')
+            shrink_filter = itk.BinShrinkImageFilter
+        extractor = getattr(self, names[0], None)
+        if extractor is None or \
+                type(extractor.GetInput()) is not type(image):
+            extractor = itk.ExtractImageFilter.New(image)
+            setattr(self, names[0], extractor)
+            setattr(self, names[1], shrink_filter.New(extractor))
+        return extractor, getattr(self, names[1])
+
+    def _image_statistics(self):
+        """Minimum and maximum of each component of the full resolution
+        image, computed once per image.
+
+        The statistics of lazily evaluated images are computed in the
+        background, so they do not delay the first render, and are None until
+        they are available. Only multiscale images have them, from their
+        coarsest level, and other rendered images carry their own."""
+        image = self.image
+        if self._statistics is None or self._statistics[0] is not image:
+            if isinstance(image, LazyImage):
+                statistics = get_pyramid_executor().submit(image.statistics)
+            else:
+                pixels = itk.array_view_from_image(image)
+                statistics = None
+                if pixels.dtype.kind in 'iuf':
+                    statistics = component_statistics(
+                        pixels, image.GetNumberOfComponentsPerPixel())
+            self._statistics = (image, statistics)
+        statistics = self._statistics[1]
+        if isinstance(statistics, concurrent.futures.Future):
+            if not statistics.done() or statistics.exception() is not None:
+                return None
+            return statistics.result()
+        return statistics
+
+    def _pyramid(self, label):
+        """The multiscale pyramid of the image, or the label image, or None
+        while it is built in the background."""
+        name = 'label_image' if label else 'image'
+        image = getattr(self, name)
+        if name in self._pyramids:
+            source, future = self._pyramids[name]
+            if source is image:
+                if future.done() and future.exception() is None:
+                    return future.result()
+                return None
+        if image.GetNumberOfComponentsPerPixel() > 1 or \
+                any(image.GetLargestPossibleRegion().GetIndex()):
+            return None
+        if self.size_limit_bytes is not None:
+            # The coarsest level is the rendered size of the whole image
+            size = image.GetLargestPossibleRegion().GetSize()
+            scale_factors = self._find_roi_scale_factors(image, size)
+            size_limit = [max(1, size[dim] // scale_factors[dim])
+                          for dim in range(image.GetImageDimension())]
+        elif image.GetImageDimension() == 2:
+            size_limit = self.size_limit_2d
+        else:
+            size_limit = self.size_limit_3d
+        future = get_pyramid_executor().submit(image_pyramid, image,
+                                               size_limit, label)
+        self._pyramids[name] = (image, future)
+        return None
+
+    @staticmethod
+    def _computed(image, label=False):
+        """The pixels of a lazily evaluated image, or the image."""
+        if isinstance(image, LazyImage):
+            dimension = image.GetImageDimension()
+            return image.extract(image.GetLargestPossibleRegion(),
+                                 [1, ] * dimension, label=label)
+        return image
 
     @validate('label_image_weights')
     def _validate_label_image_weights(self, proposal):
@@ -560,11 +1144,34 @@ class Viewer(ViewerParent):
         value = proposal['value']
         value = np.array(value, dtype=np.float32)
         if self.rendered_label_image:
-            labels = len(np.unique(itk.array_view_from_image(self.rendered_label_image)))
+            labels = len(self.label_inventory(rendered=True).labels)
             if labels != len(value):
                 raise TraitError('Number of labels, {0}, does not equal number of label weights, {1}'.format(labels, len(value)))
         return value
 
+    def label_inventory(self, rendered=False):
+        """The labels of the label image, their number of pixels, and their
+        bounding boxes, as (lower, upper) index.
+
+        The inventory is computed once per label image and modification time.
+        With rendered, or for lazily evaluated label images, it is the
+        inventory of the rendered, possibly downsampled, label image."""
+        image = self.label_image
+        if rendered or isinstance(image, LazyImage):
+            image = self.rendered_label_image
+        if image is None:
+            return None
+        pixels = itk.array_view_from_image(image)
+        key = (pixels.__array_interface__['data'][0], pixels.nbytes,
+               getattr(image, '_source_mtime', image.GetMTime()))
+        inventory = self._label_inventories.get(key)
+        if inventory is None:
+            inventory = label_inventory(pixels)
+            self._label_inventories.put(
+                key, inventory,
+                sum(array.nbytes for array in inventory))
+        return inventory
+
     @validate('label_image_blend')
     def _validate_label_image_blend(self, proposal):
         """Enforce 0 <= value <= 1.0."""
@@ -802,7 +1409,11 @@ def view(image=None,  # noqa: C901
 
     The type of the image can be an numpy.array, itk.Image,
     vtk.vtkImageData, pyvista.UniformGrid, imglyb.ReferenceGuardingRandomAccessibleInterval,
-    or a NumPy array-like, e.g. a Dask array.
+    or a NumPy array-like, e.g. a Dask array. Dask arrays, chunked arrays,
+    e.g. h5py datasets or zarr arrays, memory maps, and multiscale OME-Zarr
+    zarr.Group's are evaluated lazily: only the pixels of the rendered region
+    of interest are read, from the coarsest pyramid level that satisfies the
+    size limits.
 
     A point set or a sequence of points sets can be visualized. The type of the
     point set can be an numpy.array (Nx3 array of point positions).
@@ -974,11 +1585,76 @@ def view(image=None,  # noqa: C901
         Size limit for 3D image visualization. If the roi is larger than this
         size, it will be downsampled for visualization.
 
+    size_limit_bytes: int, default: None
+        Size limit, in bytes, of the rendered image and label image, which
+        accounts for the pixel type and the number of components. If set, it
+        is used instead of size_limit_2d and size_limit_3d, and the scale
+        factors are chosen per axis to keep the physical resolution as
+        isotropic, and as fine, as the budget allows.
+
+    roi_cache_size: int, default: 256 MiB
+        Maximum number of bytes of downsampled regions of interest kept to
+        be rendered again without recomputing them. Hits and misses are
+        reported by Viewer.roi_cache_info().
+
     sample_distance: float, default: 0.25
         Sampling distance for volume rendering, normalized from 0.0 to 1.0.
         Lower values result in a higher quality rendering. High values improve
         the framerate.
 
+    compression_level: int or 'auto', default: 3
+        zstd compression level for image and geometry data sent to the
+        browser. With 'auto', the level, or sending the data uncompressed, is
+        chosen to minimize the estimated compression, transfer, and
+        decompression time based on the measured bandwidth.
+
+    compression_shuffle: 'none', 'byte', or 'bit', default: 'none'
+        Group the bytes, or bits, of multi-byte image pixels by significance
+        before compression. This often reduces the transfer size of smooth
+        float or 16-bit scientific data considerably.
+
+    progressive: bool, default: False
+        Send a coarse preview of large images in a separate message before
+        the full resolution image, so the browser renders a first view
+        independent of the image size. Previews are read from the coarse
+        levels of the multiscale pyramid, once it is built, and are not sent
+        for the initial render.
+
+    progressive_factor: int, default: 4
+        Factor by which the size of the preview is smaller than the size
+        limits in progressive mode.
+
+    slice_streaming: bool, default: False
+        In the x, y and z view modes, send only the slice of the roi at
+        x_slice, y_slice or z_slice, downsampled to size_limit_2d, or
+        size_limit_bytes, instead of the downsampled volume. Slices of large
+        volumes are then shown at full resolution. A slider in the viewer
+        spans the slices of the volume, and moving it, or setting the slice
+        position, sends the slice at the new position.
+
+    slice_prefetch: int, default: 2
+        Number of neighbouring slices on each side of the slicing plane that
+        are rendered ahead into the roi cache in slice streaming, so scrolling
+        through the slices does not wait for them to be computed.
+
+    compact_cells: bool, default: True
+        Send the cells of geometries and point sets with 16-bit point indices
+        when possible. The indices of meshes whose cells all have the same
+        number of points, e.g. triangle meshes, are also delta coded, which
+        improves their compression.
+
+    point_set_quantization_error: float, default: None
+        If set, the coordinates of point sets are sent as 16-bit integers
+        within their bounding box when the quantization error, in world
+        units, does not exceed this value. This halves the transfer size of
+        large point clouds.
+
+    narrow_integer_types: bool, default: False
+        Send integer images and label maps with the smallest integer type,
+        e.g. uint8 or uint16, that holds their range of values. This reduces
+        the transfer size and the browser's GPU memory, at the cost of a pass
+        over the pixel data to compute the range.
+
     Returns
     -------
     viewer : ipywidget
@@ -77,13 +77,51 @@ int decompress(void * dest, size_t destCapacity, const void * src, size_t compre
     return ToResult(rc);
 }
 
+int decompressUsingDict(void * dest, size_t destCapacity, const void * src, size_t compressedSize, const void * dict, size_t dictSize )
+{
+    ZSTD_DCtx * dctx = ZSTD_createDCtx();
+    if (dctx == NULL) {
+        return ERR_ALLOCATE_DCTX;
+    }
+    const size_t rc = ZSTD_decompress_usingDict(dctx, dest, destCapacity, src, compressedSize, dict, dictSize);
+    ZSTD_freeDCtx(dctx);
+    return ToResult(rc);
+}
+
+
+static char * ReadFile(const char * fileName, unsigned long * fileLength)
+{
+  FILE * file = fopen(fileName, "rb");
+  if( !file )
+  {
+    fprintf(stderr, "Unable to open file %s", fileName);
+    return NULL;
+  }
+
+  fseek(file, 0, SEEK_END);
+  *fileLength = ftell(file);
+  fseek(file, 0, SEEK_SET);
+
+  char * buffer = (char *) malloc(*fileLength+1);
+  if( !buffer )
+  {
+    fprintf(stderr, "Memory error!");
+    fclose(file);
+    return NULL;
+  }
+
+  fread(buffer, *fileLength, 1, file);
+  fclose(file);
+  return buffer;
+}
+
 
 int main( int argc, char * argv[] )
 {
   if(argc < 4)
     {
     fprintf(stderr, "Insufficient arguments!\n");
-    fprintf(stderr, "Usage: ZstdDecompress input.bin output.bin outputFileSize");
+    fprintf(stderr, "Usage: ZstdDecompress input.bin output.bin outputFileSize [dictionary.bin]");
     return 1;
     }
 
@@ -124,7 +162,24 @@ int main( int argc, char * argv[] )
     return 1;
   }
 
-  const int result = decompress( outputBuffer, outputFileLength, inputBuffer, inputFileLength );
+  int result = 0;
+  if( argc > 4 )
+    {
+    unsigned long dictionaryFileLength;
+    char * dictionaryBuffer = ReadFile(argv[4], &dictionaryFileLength);
+    if( !dictionaryBuffer )
+    {
+      free(inputBuffer);
+      free(outputBuffer);
+      return 1;
+    }
+    result = decompressUsingDict( outputBuffer, outputFileLength, inputBuffer, inputFileLength, dictionaryBuffer, dictionaryFileLength );
+    free(dictionaryBuffer);
+    }
+  else
+    {
+    result = decompress( outputBuffer, outputFileLength, inputBuffer, inputFileLength );
+    }
   printf("result: %d", result);
 
   FILE * outputFile = fopen(outputFileName, "wb");
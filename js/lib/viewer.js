@@ -142,6 +142,7 @@ const ViewerModel = widgets.DOMWidgetModel.extend(
         select_roi: false,
         _reset_crop_requested: false,
         _scale_factors: new Uint8Array([1, 1, 1]),
+        _streamed_slice: null,
         units: '',
         point_sets: null,
         point_set_colors: { array: new Float32Array([0, 0, 0]), shape: [1,3] },
@@ -156,8 +157,38 @@ const ViewerModel = widgets.DOMWidgetModel.extend(
         annotations: true,
         mode: 'v',
         camera: new Float32Array(9),
-        background: null
+        background: null,
+        compression_level: 3,
+        _transfer_statistics: null
       })
+    },
+
+    initialize: function () {
+      widgets.DOMWidgetModel.prototype.initialize.apply(this, arguments)
+      // Fingerprint stubs are resolved as each list arrives, whether or not
+      // a view is rendered, so the entries held follow the kernel
+      this.decompressedPolyData = {}
+      const polyDataTraits = ['point_sets', 'geometries']
+      polyDataTraits.forEach((name) => {
+        this.decompress_polydata_list(name)
+        this.on(`change:${name}`, () => this.decompress_polydata_list(name))
+      })
+    },
+
+    decompress_polydata_list: function (name) {
+      const polyDataList = this.get(name)
+      if (!polyDataList) {
+        if (this.polyDataCaches) {
+          delete this.polyDataCaches[name]
+        }
+        this.decompressedPolyData[name] = []
+        return
+      }
+      this.decompressedPolyData[name] = decompressPolyDataList(
+        this,
+        name,
+        polyDataList
+      )
     }
   },
   {
@@ -243,6 +274,7 @@ const createRenderingPipeline = (
   let labelMapData = null
   if (rendered_image) {
     imageData = vtkITKHelper.convertItkToVtkImage(rendered_image)
+    setComponentRanges(imageData, rendered_image.statistics)
     is3D = rendered_image.imageType.dimension === 3
   }
   if (rendered_label_image) {
@@ -396,13 +428,23 @@ const createRenderingPipeline = (
         domWidgetView.model.save_changes()
       }
     }
-    domWidgetView.model.set('_rendering_image', false)
-    domWidgetView.model.save_changes()
+    acknowledgeRender(domWidgetView, rendered_image || rendered_label_image)
   }
 }
 
+// Let the kernel send the next render. Progressive previews are followed by
+// the full resolution image, which is acknowledged instead.
+function acknowledgeRender (domWidgetView, image) {
+  if (image.preview) {
+    return
+  }
+  domWidgetView.model.set('_rendering_image', false)
+  domWidgetView.model.save_changes()
+}
+
 function replaceRenderedImage (domWidgetView, rendered_image) {
   const imageData = vtkITKHelper.convertItkToVtkImage(rendered_image)
+  setComponentRanges(imageData, rendered_image.statistics)
 
   domWidgetView.model.skipOnCroppingPlanesChanged = true
   domWidgetView.model.itkVtkViewer.setImage(imageData)
@@ -430,8 +472,7 @@ function replaceRenderedImage (domWidgetView, rendered_image) {
     domWidgetView.model.set('cmap', ['Grayscale'])
     domWidgetView.model.save_changes()
   }
-  domWidgetView.model.set('_rendering_image', false)
-  domWidgetView.model.save_changes()
+  acknowledgeRender(domWidgetView, rendered_image)
 }
 
 function replaceRenderedLabelMap (domWidgetView, rendered_label_image) {
@@ -442,12 +483,22 @@ function replaceRenderedLabelMap (domWidgetView, rendered_label_image) {
   if (viewProxy.getViewMode() === 'VolumeRendering') {
     viewProxy.resetCamera()
   }
-  domWidgetView.model.set('_rendering_image', false)
-  domWidgetView.model.save_changes()
+  acknowledgeRender(domWidgetView, rendered_label_image)
+}
+
+// vtk.js objects of decompressed point sets and geometries, reused for the
+// entries that are unchanged in a new list
+const vtkPolyDataObjects = new WeakMap()
+
+function toVtkPolyData (polyData) {
+  if (!vtkPolyDataObjects.has(polyData)) {
+    vtkPolyDataObjects.set(polyData, vtk(polyData))
+  }
+  return vtkPolyDataObjects.get(polyData)
 }
 
 function replacePointSets (domWidgetView, pointSets) {
-  const vtkPointSets = pointSets.map((pointSet) => vtk(pointSet))
+  const vtkPointSets = pointSets.map(toVtkPolyData)
   domWidgetView.model.itkVtkViewer.setPointSets(vtkPointSets)
   domWidgetView.point_set_colors_changed()
   domWidgetView.point_set_opacities_changed()
@@ -457,18 +508,142 @@ function replacePointSets (domWidgetView, pointSets) {
 }
 
 function replaceGeometries (domWidgetView, geometries) {
-  const vtkGeometries = geometries.map((geometry) => vtk(geometry))
+  const vtkGeometries = geometries.map(toVtkPolyData)
   domWidgetView.model.itkVtkViewer.setGeometries(vtkGeometries)
   domWidgetView.geometry_colors_changed()
   domWidgetView.geometry_opacities_changed()
   domWidgetView.model.itkVtkViewer.renderLater()
 }
 
+// Inverse of the byte shuffle applied before compression: the first byte of
+// every element is stored first, followed by the second byte, etc.
+function unshuffleBytes (shuffled, itemSize) {
+  const elementCount = shuffled.length / itemSize
+  const result = new Uint8Array(shuffled.length)
+  for (let byteIndex = 0; byteIndex < itemSize; byteIndex++) {
+    const offset = byteIndex * elementCount
+    for (let element = 0; element < elementCount; element++) {
+      result[element * itemSize + byteIndex] = shuffled[offset + element]
+    }
+  }
+  return result
+}
+
+// Inverse of the bit shuffle applied before compression: every bit of the
+// elements is stored in its own plane, most significant bit first. Trailing
+// elements that do not fill a byte of every plane are stored unchanged.
+function unshuffleBits (shuffled, itemSize) {
+  const elementCount = shuffled.length / itemSize
+  const count = elementCount - (elementCount % 8)
+  const planeBytes = count / 8
+  const result = new Uint8Array(shuffled.length)
+  for (let plane = 0; plane < itemSize * 8; plane++) {
+    const byteIndex = plane >> 3
+    const bitMask = 0x80 >> (plane & 7)
+    const planeOffset = plane * planeBytes
+    for (let planeByte = 0; planeByte < planeBytes; planeByte++) {
+      // Every byte of a plane holds the bit of 8 elements, and the high
+      // planes of smooth data are mostly zero
+      const bits = shuffled[planeOffset + planeByte]
+      if (bits === 0) {
+        continue
+      }
+      const resultOffset = planeByte * 8 * itemSize + byteIndex
+      for (let bit = 0; bit < 8; bit++) {
+        if (bits & (0x80 >> bit)) {
+          result[resultOffset + bit * itemSize] |= bitMask
+        }
+      }
+    }
+  }
+  result.set(shuffled.subarray(count * itemSize), count * itemSize)
+  return result
+}
+
+// Component ranges computed by the kernel, on the full resolution image, are
+// cached on the scalars so they are not computed by scanning the pixels
+function setComponentRanges (imageData, statistics) {
+  if (!statistics) {
+    return
+  }
+  const scalars = imageData.getPointData().getScalars()
+  statistics.min.forEach((min, component) => {
+    scalars.setRange({ min, max: statistics.max[component] }, component)
+  })
+}
+
+function unshuffle (shuffled, itemSize, shuffle) {
+  switch (shuffle) {
+    case 'byte':
+      return unshuffleBytes(shuffled, itemSize)
+    case 'bit':
+      return unshuffleBits(shuffled, itemSize)
+    default:
+      return shuffled
+  }
+}
+
+// Shuffled frames are unshuffled in a worker, next to the decompression
+// workers, so large images do not block the main thread. The functions are
+// self-contained, so their source is the source of the worker.
+const unshuffleWorkerSource = `
+const unshuffleBytes = (${unshuffleBytes.toString()})
+const unshuffleBits = (${unshuffleBits.toString()})
+self.onmessage = function (event) {
+  const { id, data, itemSize, shuffle } = event.data
+  const result = shuffle === 'bit'
+    ? unshuffleBits(data, itemSize)
+    : unshuffleBytes(data, itemSize)
+  self.postMessage({ id, data: result }, [result.buffer])
+}
+`
+let unshuffleWorker = null
+let unshuffleRequestId = 0
+const unshuffleRequests = new Map()
+
+function getUnshuffleWorker () {
+  if (unshuffleWorker === null) {
+    try {
+      const blob = new Blob([unshuffleWorkerSource], {
+        type: 'application/javascript'
+      })
+      unshuffleWorker = new Worker(URL.createObjectURL(blob))
+      unshuffleWorker.onmessage = (event) => {
+        const { id, data } = event.data
+        const resolve = unshuffleRequests.get(id)
+        unshuffleRequests.delete(id)
+        resolve(data)
+      }
+    } catch (error) {
+      // e.g. a content security policy that does not allow blob workers
+      console.warn(`Unshuffling on the main thread: ${error}`)
+      unshuffleWorker = false
+    }
+  }
+  return unshuffleWorker
+}
+
+function unshuffleInWorker (shuffled, itemSize, shuffle) {
+  if (shuffle !== 'byte' && shuffle !== 'bit') {
+    return Promise.resolve(shuffled)
+  }
+  const worker = getUnshuffleWorker()
+  if (!worker) {
+    return Promise.resolve(unshuffle(shuffled, itemSize, shuffle))
+  }
+  const id = unshuffleRequestId++
+  return new Promise((resolve) => {
+    unshuffleRequests.set(id, resolve)
+    worker.postMessage({ id, data: shuffled, itemSize, shuffle }, [
+      shuffled.buffer
+    ])
+  })
+}
+
 async function decompressImage (image) {
   if (image.data) {
     return image
   }
-  const byteArray = new Uint8Array(image.compressedData.buffer)
   const reducer = (accumulator, currentValue) => accumulator * currentValue
   const pixelCount = image.size.reduce(reducer, 1)
   let componentSize = null
@@ -509,24 +684,68 @@ async function decompressImage (image) {
       )
   }
   const numberOfBytes = pixelCount * image.imageType.components * componentSize
-  const pipelinePath = 'ZstdDecompress'
-  const args = ['input.bin', 'output.bin', String(numberOfBytes)]
-  const desiredOutputs = [{ path: 'output.bin', type: IOTypes.Binary }]
-  const inputs = [{ path: 'input.bin', type: IOTypes.Binary, data: byteArray }]
-  console.log(`input MB: ${byteArray.length / 1000 / 1000}`)
+  // Large images are split into independently compressed frames that are
+  // decompressed in parallel
+  const frames = Array.isArray(image.compressedData)
+    ? image.compressedData
+    : [image.compressedData]
+  const chunkSize = image.chunkSize ? image.chunkSize : numberOfBytes
+  let compressedBytes = 0
+  frames.forEach((frame) => {
+    compressedBytes += frame.byteLength
+  })
+  console.log(`input MB: ${compressedBytes / 1000 / 1000}`)
   console.log(`output MB: ${numberOfBytes / 1000 / 1000}`)
-  const compressionAmount = byteArray.length / numberOfBytes
+  const compressionAmount = compressedBytes / numberOfBytes
   console.log(`compression amount: ${compressionAmount}`)
   const t0 = performance.now()
-  const taskArgsArray = [[pipelinePath, args, desiredOutputs, inputs]]
-  const results = await workerPool.runTasks(taskArgsArray)
+  let decompressed = null
+  if (image.compression === 'raw') {
+    decompressed = new Uint8Array(frames[0].buffer)
+  } else {
+    const pipelinePath = 'ZstdDecompress'
+    const desiredOutputs = [{ path: 'output.bin', type: IOTypes.Binary }]
+    const taskArgsArray = frames.map((frame, index) => {
+      const byteArray = new Uint8Array(frame.buffer)
+      const frameBytes = Math.min(chunkSize, numberOfBytes - index * chunkSize)
+      const args = ['input.bin', 'output.bin', String(frameBytes)]
+      const inputs = [
+        { path: 'input.bin', type: IOTypes.Binary, data: byteArray }
+      ]
+      return [pipelinePath, args, desiredOutputs, inputs]
+    })
+    const results = await workerPool.runTasks(taskArgsArray)
+    // Shuffled frames are unshuffled independently
+    const frameData = await Promise.all(
+      results.map((result) =>
+        unshuffleInWorker(
+          result.outputs[0].data,
+          componentSize,
+          image.shuffle
+        )
+      )
+    )
+    if (frameData.length === 1) {
+      decompressed = frameData[0]
+    } else {
+      decompressed = new Uint8Array(numberOfBytes)
+      frameData.forEach((data, index) => {
+        decompressed.set(data, index * chunkSize)
+      })
+    }
+  }
   const t1 = performance.now()
   const duration = Number(t1 - t0)
     .toFixed(1)
     .toString()
   console.log('decompression took ' + duration + ' milliseconds.')
+  image.transferStatistics = {
+    compressedBytes,
+    decompressedBytes: numberOfBytes,
+    duration: t1 - t0,
+    sequence: image.sequence
+  }
 
-  const decompressed = results[0].outputs[0].data
   switch (image.imageType.componentType) {
     case IntTypes.Int8:
       image.data = new Int8Array(decompressed.buffer)
@@ -603,78 +822,114 @@ function decompressDataValue (polyData, prop) {
   })
 }
 
-async function decompressPolyData (polyData) {
+// The data arrays of a vtk.js PolyData that hold compressed values
+function polyDataValueArrays (polyData) {
+  const valueArrays = []
   const props = ['points', 'verts', 'lines', 'polys', 'strips']
-  const decompressedProps = []
-  const taskArgsArray = []
-  for (let index = 0; index < props.length; index++) {
-    const prop = props[index]
-    if (!polyData.hasOwnProperty(prop)) {
-      continue
-    }
-    const byteArray = new Uint8Array(polyData[prop].compressedValues.buffer)
-    const elementSize = DataTypeByteSize[polyData[prop].dataType]
-    const numberOfBytes = polyData[prop].size * elementSize
-    const pipelinePath = 'ZstdDecompress'
-    const args = ['input.bin', 'output.bin', String(numberOfBytes)]
-    const desiredOutputs = [{ path: 'output.bin', type: IOTypes.Binary }]
-    const inputs = [
-      { path: 'input.bin', type: IOTypes.Binary, data: byteArray }
-    ]
-    console.log(`${prop} input MB: ${byteArray.length / 1000 / 1000}`)
-    console.log(`${prop} output MB: ${numberOfBytes / 1000 / 1000}`)
-    const compressionAmount = byteArray.length / numberOfBytes
-    console.log(`${prop} compression amount: ${compressionAmount}`)
-    taskArgsArray.push([pipelinePath, args, desiredOutputs, inputs])
-    decompressedProps.push(prop)
+  props.forEach((prop) => {
+    if (polyData.hasOwnProperty(prop)) {
+      valueArrays.push(polyData[prop])
+    }
+  })
+  const dataTypes = ['pointData', 'cellData']
+  dataTypes.forEach((dataType) => {
+    if (polyData.hasOwnProperty(dataType)) {
+      polyData[dataType].arrays.forEach((array) => {
+        valueArrays.push(array.data)
+      })
+    }
+  })
+  return valueArrays
+}
+
+// Inverse of the delta and zigzag coding of the point indices of cells that
+// all have cellSize points
+function decodeCells (encoded, dataType, cellSize) {
+  const values = new window[dataType](encoded.length)
+  let previous = 0
+  for (let index = 0; index < encoded.length; index += cellSize + 1) {
+    values[index] = encoded[index]
+    for (let point = 1; point <= cellSize; point++) {
+      const zigzag = encoded[index + point]
+      previous += (zigzag >>> 1) ^ -(zigzag & 1)
+      values[index + point] = previous
+    }
   }
+  return values
+}
 
-  const decompressedPointData = []
-  if (polyData.hasOwnProperty('pointData')) {
-    const pointDataArrays = polyData.pointData.arrays
-    for (let index = 0; index < pointDataArrays.length; index++) {
-      const array = pointDataArrays[index]
-      const byteArray = new Uint8Array(array.data.compressedValues.buffer)
-      const elementSize = DataTypeByteSize[array.data.dataType]
-      const numberOfBytes = array.data.size * elementSize
-      const pipelinePath = 'ZstdDecompress'
-      const args = ['input.bin', 'output.bin', String(numberOfBytes)]
-      const desiredOutputs = [{ path: 'output.bin', type: IOTypes.Binary }]
-      const inputs = [
-        { path: 'input.bin', type: IOTypes.Binary, data: byteArray }
-      ]
-      console.log(`${array} input MB: ${byteArray.length / 1000 / 1000}`)
-      console.log(`${array} output MB: ${numberOfBytes / 1000 / 1000}`)
-      const compressionAmount = byteArray.length / numberOfBytes
-      console.log(`${array} compression amount: ${compressionAmount}`)
-      taskArgsArray.push([pipelinePath, args, desiredOutputs, inputs])
-      decompressedPointData.push(array)
+// The values of a data array from its decompressed bytes. Point coordinates
+// may be encoded as 16-bit integers within their bounding box, and cells with
+// 16-bit and delta coded indices.
+function decodeValues (valueArray, bytes) {
+  const encodedDataType = valueArray.encodedDataType || valueArray.dataType
+  const encoded = new window[encodedDataType](bytes.buffer)
+  if (valueArray.cellSize) {
+    return decodeCells(encoded, valueArray.dataType, valueArray.cellSize)
+  }
+  if (!valueArray.quantization) {
+    if (encodedDataType !== valueArray.dataType) {
+      return window[valueArray.dataType].from(encoded)
     }
+    return encoded
+  }
+  const { offset, scale } = valueArray.quantization
+  const values = new window[valueArray.dataType](encoded.length)
+  for (let index = 0; index < encoded.length; index += 3) {
+    values[index] = offset[0] + encoded[index] * scale[0]
+    values[index + 1] = offset[1] + encoded[index + 1] * scale[1]
+    values[index + 2] = offset[2] + encoded[index + 2] * scale[2]
   }
+  return values
+}
 
-  const decompressedCellData = []
-  if (polyData.hasOwnProperty('cellData')) {
-    const cellDataArrays = polyData.cellData.arrays
-    for (let index = 0; index < cellDataArrays.length; index++) {
-      const array = cellDataArrays[index]
-      const byteArray = new Uint8Array(array.data.compressedValues.buffer)
-      const elementSize = DataTypeByteSize[array.data.dataType]
-      const numberOfBytes = array.data.size * elementSize
-      const pipelinePath = 'ZstdDecompress'
-      const args = ['input.bin', 'output.bin', String(numberOfBytes)]
-      const desiredOutputs = [{ path: 'output.bin', type: IOTypes.Binary }]
+async function decompressPolyData (polyData) {
+  const valueArrays = polyDataValueArrays(polyData)
+  const compressedArrays = []
+  const taskArgsArray = []
+  let compressedBytes = 0
+  let decompressedBytes = 0
+  valueArrays.forEach((valueArray) => {
+    // Large arrays are split into independently compressed frames
+    const frames = Array.isArray(valueArray.compressedValues)
+      ? valueArray.compressedValues
+      : [valueArray.compressedValues]
+    const byteArrays = frames.map((frame) => new Uint8Array(frame.buffer))
+    const encodedDataType = valueArray.encodedDataType || valueArray.dataType
+    const elementSize = DataTypeByteSize[encodedDataType]
+    const numberOfBytes = valueArray.size * elementSize
+    const chunkSize = valueArray.chunkSize ? valueArray.chunkSize : numberOfBytes
+    byteArrays.forEach((byteArray) => {
+      compressedBytes += byteArray.length
+    })
+    decompressedBytes += numberOfBytes
+    if (valueArray.compression === 'raw') {
+      valueArray.values = decodeValues(valueArray, byteArrays[0])
+      return
+    }
+    const pipelinePath = 'ZstdDecompress'
+    const desiredOutputs = [{ path: 'output.bin', type: IOTypes.Binary }]
+    byteArrays.forEach((byteArray, index) => {
+      const frameBytes = Math.min(chunkSize, numberOfBytes - index * chunkSize)
+      const args = ['input.bin', 'output.bin', String(frameBytes)]
       const inputs = [
         { path: 'input.bin', type: IOTypes.Binary, data: byteArray }
       ]
-      console.log(`${array} input MB: ${byteArray.length / 1000 / 1000}`)
-      console.log(`${array} output MB: ${numberOfBytes / 1000 / 1000}`)
-      const compressionAmount = byteArray.length / numberOfBytes
-      console.log(`${array} compression amount: ${compressionAmount}`)
       taskArgsArray.push([pipelinePath, args, desiredOutputs, inputs])
-      decompressedCellData.push(array)
-    }
-  }
+    })
+    compressedArrays.push({
+      valueArray,
+      frameCount: byteArrays.length,
+      chunkSize,
+      numberOfBytes
+    })
+  })
+  console.log(`PolyData input MB: ${compressedBytes / 1000 / 1000}`)
+  console.log(`PolyData output MB: ${decompressedBytes / 1000 / 1000}`)
+  const compressionAmount = compressedBytes / decompressedBytes
+  console.log(`PolyData compression amount: ${compressionAmount}`)
 
+  // All the frames of all the arrays are decompressed concurrently
   const t0 = performance.now()
   const results = await workerPool.runTasks(taskArgsArray)
   const t1 = performance.now()
@@ -682,28 +937,107 @@ async function decompressPolyData (polyData) {
     .toFixed(1)
     .toString()
   console.log(`PolyData decompression took ${duration} milliseconds.`)
-  for (let index = 0; index < decompressedProps.length; index++) {
-    const prop = decompressedProps[index]
-    polyData[prop].values = new window[polyData[prop].dataType](
-      results[index].outputs[0].data.buffer
-    )
+  let resultIndex = 0
+  compressedArrays.forEach(
+    ({ valueArray, frameCount, chunkSize, numberOfBytes }) => {
+      let decompressed = null
+      if (frameCount === 1) {
+        decompressed = results[resultIndex].outputs[0].data
+      } else {
+        decompressed = new Uint8Array(numberOfBytes)
+        for (let frame = 0; frame < frameCount; frame++) {
+          decompressed.set(
+            results[resultIndex + frame].outputs[0].data,
+            frame * chunkSize
+          )
+        }
+      }
+      resultIndex += frameCount
+      valueArray.values = decodeValues(valueArray, decompressed)
+    }
+  )
+  polyData.transferStatistics = {
+    compressedBytes,
+    decompressedBytes,
+    duration: t1 - t0,
+    sequence: polyData.sequence
   }
-  for (let index = 0; index < decompressedPointData.length; index++) {
-    polyData.pointData.arrays[index].data.values = new window[
-      polyData.pointData.arrays[index].data.dataType
-    ](results[decompressedProps.length + index].outputs[0].data.buffer)
+
+  return polyData
+}
+
+// Decompress the entries of the point_sets or geometries trait. Entries the
+// kernel knows are unchanged since the previous list are sent as fingerprint
+// stubs, and they are resolved from the entries of the previous list. The
+// model resolves every list it receives, so the previous list is the one the
+// kernel last sent.
+function decompressPolyDataList (model, name, polyDataList) {
+  if (!model.polyDataCaches) {
+    model.polyDataCaches = {}
   }
-  for (let index = 0; index < decompressedCellData.length; index++) {
-    polyData.cellData.arrays[index].data.values = new window[
-      polyData.cellData.arrays[index].data.dataType
-    ](
-      results[
-        decompressedProps.length + decompressedPointData.length + index
-      ].outputs[0].data.buffer
+  const previous = model.polyDataCaches[name] || new Map()
+  const cache = new Map()
+  const decompressed = polyDataList.map((polyData) => {
+    const fingerprint = polyData.fingerprint
+    let promise = null
+    if (!polyData.hasOwnProperty('vtkClass')) {
+      if (!previous.has(fingerprint)) {
+        throw new Error(`Unknown geometry fingerprint: ${fingerprint}`)
+      }
+      promise = previous.get(fingerprint)
+    } else {
+      promise = decompressPolyData(polyData)
+    }
+    if (fingerprint) {
+      cache.set(fingerprint, promise)
+    }
+    return promise
+  })
+  model.polyDataCaches[name] = cache
+  return decompressed
+}
+
+// Report the size and decompression time of a payload to the kernel, which
+// uses them to select the compression level
+function reportTransferStatistics (domWidgetView, decompressed) {
+  if (domWidgetView.model.get('compression_level') !== 'auto') {
+    return
+  }
+  const statistics = {
+    compressedBytes: 0,
+    decompressedBytes: 0,
+    duration: 0,
+    sequence: null
+  }
+  // The kernel pairs the statistics with the payload it sent by its sequence
+  // number, if they are of a single payload
+  const sequences = new Set()
+  decompressed.forEach((data) => {
+    // Entries reused from a previous payload were already reported
+    if (data.transferStatistics.reported) {
+      return
+    }
+    data.transferStatistics.reported = true
+    sequences.add(data.transferStatistics.sequence)
+    statistics.compressedBytes += data.transferStatistics.compressedBytes
+    statistics.decompressedBytes += data.transferStatistics.decompressedBytes
+    // Decompression runs concurrently on the worker pool
+    statistics.duration = Math.max(
+      statistics.duration,
+      data.transferStatistics.duration
     )
+  })
+  if (statistics.compressedBytes === 0) {
+    return
   }
-
-  return polyData
+  if (sequences.size === 1) {
+    const sequence = sequences.values().next().value
+    if (sequence !== undefined) {
+      statistics.sequence = sequence
+    }
+  }
+  domWidgetView.model.set('_transfer_statistics', statistics)
+  domWidgetView.model.save_changes()
 }
 
 // Custom View. Renders the widget model.
@@ -747,6 +1081,7 @@ const ViewerView = widgets.DOMWidgetView.extend({
     if (rendered_image || rendered_label_image) {
       this.select_roi_changed()
       this.scale_factors_changed()
+      this.streamed_slice_changed()
     }
     if (rendered_label_image) {
       this.label_image_names_changed()
@@ -995,6 +1330,10 @@ const ViewerView = widgets.DOMWidgetView.extend({
       )
 
       const onXSliceChanged = (position) => {
+        // The viewer only holds the streamed slice
+        if (this.model.get('_streamed_slice')) {
+          return
+        }
         if (position !== this.model.get('x_slice')) {
           this.model.set('x_slice', position)
           this.model.save_changes()
@@ -1006,6 +1345,10 @@ const ViewerView = widgets.DOMWidgetView.extend({
         this.model.save_changes()
       }
       const onYSliceChanged = (position) => {
+        // The viewer only holds the streamed slice
+        if (this.model.get('_streamed_slice')) {
+          return
+        }
         if (position !== this.model.get('y_slice')) {
           this.model.set('y_slice', position)
           this.model.save_changes()
@@ -1017,6 +1360,10 @@ const ViewerView = widgets.DOMWidgetView.extend({
         this.model.save_changes()
       }
       const onZSliceChanged = (position) => {
+        // The viewer only holds the streamed slice
+        if (this.model.get('_streamed_slice')) {
+          return
+        }
         if (position !== this.model.get('z_slice')) {
           this.model.set('z_slice', position)
           this.model.save_changes()
@@ -1183,6 +1530,7 @@ const ViewerView = widgets.DOMWidgetView.extend({
     this.model.on('change:blend_mode', this.blend_mode_changed, this)
     this.model.on('change:select_roi', this.select_roi_changed, this)
     this.model.on('change:_scale_factors', this.scale_factors_changed, this)
+    this.model.on('change:_streamed_slice', this.streamed_slice_changed, this)
     this.model.on('change:point_sets', this.point_sets_changed, this)
     this.model.on(
       'change:point_set_colors',
@@ -1236,11 +1584,15 @@ const ViewerView = widgets.DOMWidgetView.extend({
     }
     const point_sets = this.model.get('point_sets')
     if (point_sets && !!point_sets.length) {
-      toDecompress = toDecompress.concat(point_sets.map(decompressPolyData))
+      toDecompress = toDecompress.concat(
+        this.model.decompressedPolyData.point_sets
+      )
     }
     const geometries = this.model.get('geometries')
     if (geometries && !!geometries.length) {
-      toDecompress = toDecompress.concat(geometries.map(decompressPolyData))
+      toDecompress = toDecompress.concat(
+        this.model.decompressedPolyData.geometries
+      )
     }
     const domWidgetView = this
     Promise.all(toDecompress).then((decompressedData) => {
@@ -1287,6 +1639,12 @@ const ViewerView = widgets.DOMWidgetView.extend({
       if (!rendered_image.data) {
         const domWidgetView = this
         decompressImage(rendered_image).then((decompressed) => {
+          reportTransferStatistics(domWidgetView, [decompressed])
+          if (domWidgetView.model.get('rendered_image') !== rendered_image) {
+            // A newer image, e.g. the full resolution image that follows a
+            // progressive preview, arrived during decompression
+            return Promise.resolve(null)
+          }
           if (domWidgetView.model.hasOwnProperty('itkVtkViewer')) {
             return Promise.resolve(
               replaceRenderedImage(domWidgetView, decompressed)
@@ -1316,6 +1674,10 @@ const ViewerView = widgets.DOMWidgetView.extend({
       if (!rendered_label_image.data) {
         const domWidgetView = this
         decompressImage(rendered_label_image).then((decompressed) => {
+          reportTransferStatistics(domWidgetView, [decompressed])
+          if (domWidgetView.model.get('rendered_label_image') !== rendered_label_image) {
+            return Promise.resolve(null)
+          }
           if (domWidgetView.model.hasOwnProperty('itkVtkViewer')) {
             return Promise.resolve(
               replaceRenderedLabelMap(domWidgetView, decompressed)
@@ -1367,10 +1729,13 @@ const ViewerView = widgets.DOMWidgetView.extend({
   point_sets_changed: function () {
     const point_sets = this.model.get('point_sets')
     if (point_sets && !!point_sets.length) {
-      if (!point_sets[0].points.values) {
+      if (!point_sets[0].points || !point_sets[0].points.values) {
         const domWidgetView = this
-        return Promise.all(point_sets.map(decompressPolyData)).then(
+        return Promise.all(
+          this.model.decompressedPolyData.point_sets
+        ).then(
           (decompressed) => {
+            reportTransferStatistics(domWidgetView, decompressed)
             if (domWidgetView.model.hasOwnProperty('itkVtkViewer')) {
               return Promise.resolve(
                 replacePointSets(domWidgetView, decompressed)
@@ -1475,10 +1840,13 @@ const ViewerView = widgets.DOMWidgetView.extend({
   geometries_changed: function () {
     const geometries = this.model.get('geometries')
     if (geometries && !!geometries.length) {
-      if (!geometries[0].points.values) {
+      if (!geometries[0].points || !geometries[0].points.values) {
         const domWidgetView = this
-        return Promise.all(geometries.map(decompressPolyData)).then(
+        return Promise.all(
+          this.model.decompressedPolyData.geometries
+        ).then(
           (decompressed) => {
+            reportTransferStatistics(domWidgetView, decompressed)
             if (domWidgetView.model.hasOwnProperty('itkVtkViewer')) {
               return Promise.resolve(
                 replaceGeometries(domWidgetView, decompressed)
@@ -1702,6 +2070,7 @@ const ViewerView = widgets.DOMWidgetView.extend({
     if (
       this.model.hasOwnProperty('itkVtkViewer') &&
       !this.model.use2D &&
+      !this.model.get('_streamed_slice') &&
       position !== null
     ) {
       this.model.itkVtkViewer.setXSlice(position)
@@ -1713,6 +2082,7 @@ const ViewerView = widgets.DOMWidgetView.extend({
     if (
       this.model.hasOwnProperty('itkVtkViewer') &&
       !this.model.use2D &&
+      !this.model.get('_streamed_slice') &&
       position !== null
     ) {
       this.model.itkVtkViewer.setYSlice(position)
@@ -1724,6 +2094,7 @@ const ViewerView = widgets.DOMWidgetView.extend({
     if (
       this.model.hasOwnProperty('itkVtkViewer') &&
       !this.model.use2D &&
+      !this.model.get('_streamed_slice') &&
       position !== null
     ) {
       this.model.itkVtkViewer.setZSlice(position)
@@ -1831,6 +2202,45 @@ const ViewerView = widgets.DOMWidgetView.extend({
     }
   },
 
+  // In slice streaming, only the slice is sent, so the slider of the viewer
+  // spans a single slice. This slider spans the slices of the image, and
+  // requests the slice at its position from the kernel.
+  streamed_slice_changed: function () {
+    const streamedSlice = this.model.get('_streamed_slice')
+    if (!streamedSlice) {
+      if (this.streamedSliceSlider) {
+        this.streamedSliceSlider.style.display = 'none'
+      }
+      return
+    }
+    if (!this.streamedSliceSlider) {
+      const slider = document.createElement('input')
+      slider.type = 'range'
+      slider.min = 0
+      slider.step = 1
+      slider.style.position = 'absolute'
+      slider.style.bottom = '5px'
+      slider.style.left = '25%'
+      slider.style.width = '50%'
+      slider.style.zIndex = 1000
+      slider.addEventListener('input', () => {
+        const { size, positions } = this.model.get('_streamed_slice')
+        const fraction = size > 1 ? Number(slider.value) / (size - 1) : 0
+        const position = positions[0] + fraction * (positions[1] - positions[0])
+        this.model.set(`${this.model.get('mode')}_slice`, position)
+        this.model.save_changes()
+      })
+      if (window.getComputedStyle(this.el).position === 'static') {
+        this.el.style.position = 'relative'
+      }
+      this.el.appendChild(slider)
+      this.streamedSliceSlider = slider
+    }
+    this.streamedSliceSlider.max = streamedSlice.size - 1
+    this.streamedSliceSlider.value = streamedSlice.index
+    this.streamedSliceSlider.style.display = ''
+  },
+
   initialize_viewer: function () {
     this.initialize_itkVtkViewer()
     // possible to override in extensions
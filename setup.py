@@ -166,7 +166,7 @@ setup_args = {
         'six',
         'zstandard',
     ],
-    'packages': find_packages(),
+    'packages': find_packages(exclude=['benchmarks']),
     'zip_safe': False,
     'cmdclass': {
         'build_py': js_prerelease(build_py),
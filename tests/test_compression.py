@@ -0,0 +1,103 @@
+import numpy as np
+
+from itkwidgets import _compression
+
+
+def test_compress_raw():
+    array = np.arange(1000, dtype=np.float32)
+    compressed = _compression.compress(array.data, level=None)
+    assert(compressed.nbytes == array.nbytes)
+    decompressed = _compression.decompress(compressed, array.nbytes,
+                                           compression='raw')
+    assert(np.array_equal(np.frombuffer(decompressed, dtype=np.float32),
+                          array))
+
+
+def test_adaptive_level():
+    array = np.tile(np.arange(256, dtype=np.uint8), 16 * 1024)
+
+    adaptive = _compression.AdaptiveLevel()
+    # No measurements yet
+    assert(adaptive.select([array.data]) == _compression.DEFAULT_LEVEL)
+
+    # A very fast link is not worth the compression time
+    adaptive.bandwidth = 1.0e15
+    assert(adaptive.select([array.data]) is None)
+
+    # A very slow link is worth the highest compression ratio
+    adaptive.bandwidth = 1.0e3
+    assert(adaptive.select([array.data]) in _compression.ADAPTIVE_LEVELS)
+
+
+def test_adaptive_level_estimates(monkeypatch):
+    array = np.tile(np.arange(256, dtype=np.uint8), 16 * 1024)
+    adaptive = _compression.AdaptiveLevel()
+    adaptive.bandwidth = 1.0e3
+
+    samples = []
+    sample = _compression._sample
+
+    def counted_sample(buffers):
+        samples.append(buffers)
+        return sample(buffers)
+    monkeypatch.setattr(_compression, '_sample', counted_sample)
+    # The estimates are reused for payloads of the same type and size, and
+    # measured again periodically
+    for _ in range(_compression.ESTIMATE_REUSE + 1):
+        adaptive.select([array.data])
+    assert(len(samples) == 2)
+    adaptive.select([array.astype(np.uint16).data])
+    assert(len(samples) == 3)
+
+
+def test_adaptive_level_record():
+    adaptive = _compression.AdaptiveLevel()
+    first = adaptive.record_sent(1000)
+    second = adaptive.record_sent(1000)
+    assert(first != second)
+    adaptive.record_received(1000, 4000, 0.0, second)
+    assert(adaptive.bandwidth > 0.0)
+    # Statistics without a sequence number only update the decompression
+    # throughput
+    bandwidth = adaptive.bandwidth
+    adaptive.record_received(1000, 4000, 0.5)
+    assert(adaptive.decompression_throughput == 8000.0)
+    assert(adaptive.bandwidth == bandwidth)
+    assert(list(adaptive._sent) == [first])
+
+
+def test_shuffle_buffer():
+    # 13 elements: the trailing elements do not fill a byte of a bit plane
+    array = np.linspace(0.0, 1.0, 13, dtype=np.float32)
+    for mode in ('byte', 'bit'):
+        shuffled = _compression.shuffle_buffer(array.data, 4, mode)
+        assert(shuffled.nbytes == array.nbytes)
+        unshuffled = _compression.unshuffle_buffer(shuffled, 4, mode)
+        assert(np.array_equal(np.frombuffer(unshuffled, dtype=np.float32),
+                              array))
+
+    array = np.array([0x0102, 0x0304], dtype='<u2')
+    shuffled = _compression.shuffle_buffer(array.data, 2, 'byte')
+    assert(shuffled.tolist() == [0x02, 0x04, 0x01, 0x03])
+
+
+def test_train_dictionary():
+    buffers = [np.arange(i, i + 100, dtype=np.float32) for i in range(32)]
+    assert(_compression.train_dictionary(buffers[:4]) is None)
+    dictionary = _compression.train_dictionary(buffers)
+    assert(dictionary is not None)
+    compressed = _compression.compress_frame(buffers[0].data,
+                                             dictionary=dictionary)
+    decompressed = _compression.decompress(compressed, buffers[0].nbytes,
+                                           dictionary=dictionary)
+    assert(np.array_equal(np.frombuffer(decompressed, dtype=np.float32),
+                          buffers[0]))
+
+
+def test_decompress_into():
+    array = np.random.random(1000).astype(np.float32)
+    compressed = _compression.compress(array.data, chunk_size=1024)
+    assert(len(compressed) == 4)
+    output = np.empty_like(array)
+    _compression.decompress_into(compressed, output, chunk_size=1024)
+    assert(np.array_equal(output, array))
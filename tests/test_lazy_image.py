@@ -0,0 +1,229 @@
+import itk
+import numpy as np
+import pytest
+
+from itkwidgets._lazy_image import ChunkedImage, LazyImage, MultiscaleImage, to_lazy_image, _ome_zarr_multiscale
+
+
+def _label_mode(array, factors):
+    shape = tuple(size // factor for size, factor in zip(array.shape, factors))
+    mode = np.zeros(shape, dtype=array.dtype)
+    for index in np.ndindex(*shape):
+        block = array[tuple(slice(i * f, (i + 1) * f)
+                            for i, f in zip(index, factors))]
+        labels, counts = np.unique(block[block != 0], return_counts=True)
+        if len(labels):
+            mode[index] = labels[np.argmax(counts)]
+    return mode
+
+
+def test_label_mode_shrink():
+    random = np.random.RandomState(0)
+    array = random.randint(0, 4, size=(16, 12, 20)).astype(np.uint8)
+    array[random.random_sample(array.shape) < 0.5] = 0
+    lazy = LazyImage(array)
+    labels = lazy.extract(lazy.GetLargestPossibleRegion(), [5, 3, 2],
+                          label=True)
+    assert np.array_equal(itk.array_view_from_image(labels),
+                          _label_mode(array, (2, 3, 5)))
+
+    # Thin structures stay visible
+    array = np.zeros((64, 64, 64), dtype=np.uint16)
+    array[:, 33, 33] = 7
+    lazy = LazyImage(array)
+    labels = lazy.extract(lazy.GetLargestPossibleRegion(), [4, 4, 4],
+                          label=True)
+    assert np.all(itk.array_view_from_image(labels)[:, 8, 8] == 7)
+    assert np.count_nonzero(itk.array_view_from_image(labels)) == 16
+
+
+def test_lazy_image_geometry():
+    array = np.arange(6 * 5 * 4, dtype=np.uint8).reshape((6, 5, 4))
+    lazy = LazyImage(array, spacing=(2.0, 2.0, 2.0))
+    assert lazy.GetImageDimension() == 3
+    assert tuple(lazy.GetLargestPossibleRegion().GetSize()) == (4, 5, 6)
+    assert tuple(lazy.TransformPhysicalPointToIndex((4.0, 2.0, 0.0))) == (2, 1, 0)
+    assert to_lazy_image(array) is None
+    assert to_lazy_image(lazy) is lazy
+
+    region = itk.ImageRegion[3]()
+    region.SetIndex((1, 1, 1))
+    region.SetSize((2, 3, 4))
+    image = lazy.extract(region, [1, 1, 1])
+    assert np.array_equal(itk.array_view_from_image(image), array[1:5, 1:4, 1:3])
+    assert np.allclose(image.GetOrigin(), (2.0, 2.0, 2.0))
+
+
+def test_dask_image_extract():
+    dask_array = pytest.importorskip("dask.array")
+    array = np.random.random((32, 30, 28)).astype(np.float32)
+    lazy = to_lazy_image(dask_array.from_array(array, chunks=(7, 9, 11)))
+    region = lazy.GetLargestPossibleRegion()
+    shrunk = lazy.extract(region, [2, 3, 4])
+
+    expected = itk.bin_shrink_image_filter(itk.image_from_array(array),
+                                           shrink_factors=[2, 3, 4])
+    assert np.allclose(itk.array_view_from_image(shrunk),
+                       itk.array_view_from_image(expected), atol=1e-5)
+    assert np.allclose(shrunk.GetSpacing(), expected.GetSpacing())
+    assert np.allclose(shrunk.GetOrigin(), expected.GetOrigin())
+
+    labels = (array * 4).astype(np.uint8)
+    lazy = to_lazy_image(dask_array.from_array(labels, chunks=(7, 9, 11)))
+    shrunk = lazy.extract(region, [2, 3, 4], label=True)
+    assert np.array_equal(itk.array_view_from_image(shrunk),
+                          _label_mode(labels, (4, 3, 2)))
+
+    # The whole array is not read for statistics
+    assert lazy.statistics() is None
+
+
+def test_chunked_image_extract(tmpdir):
+    array = np.random.randint(0, 1000, size=(33, 30, 28)).astype(np.uint16)
+    memmap = np.memmap(str(tmpdir.join('image.raw')), dtype=np.uint16,
+                       mode='w+', shape=array.shape)
+    memmap[:] = array
+    lazy = to_lazy_image(memmap)
+    assert isinstance(lazy, ChunkedImage)
+    region = lazy.GetLargestPossibleRegion()
+
+    shrunk = lazy.extract(region, [4, 3, 2])
+    expected = itk.bin_shrink_image_filter(itk.image_from_array(array),
+                                           shrink_factors=[4, 3, 2])
+    assert np.array_equal(itk.array_view_from_image(shrunk),
+                          itk.array_view_from_image(expected))
+    assert np.allclose(shrunk.GetOrigin(), expected.GetOrigin())
+
+    labels = lazy.extract(region, [4, 3, 2], label=True)
+    assert np.array_equal(itk.array_view_from_image(labels),
+                          _label_mode(array[:32, :30, :28], (2, 3, 4)))
+
+
+
+class _ChunkedArray(object):
+    """An array read on slicing that records the slabs that are read."""
+
+    def __init__(self, array, chunks):
+        self.array = array
+        self.chunks = chunks
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.ndim = array.ndim
+        self.reads = []
+
+    def __array__(self, dtype=None):
+        return self.array
+
+    def __getitem__(self, slices):
+        self.reads.append(slices[0])
+        return self.array[slices]
+
+
+def test_chunked_image_slabs():
+    array = np.random.random((64, 16)).astype(np.float32)
+    chunked = _ChunkedArray(array, chunks=(10, 16))
+    lazy = to_lazy_image(chunked)
+    shrunk = lazy.extract(lazy.GetLargestPossibleRegion(), [1, 4])
+    assert np.allclose(itk.array_view_from_image(shrunk),
+                       array.reshape((16, 4, 16)).mean(axis=1))
+    # Slabs are a multiple of both the chunk height and the bin height
+    assert sorted(read.start for read in chunked.reads) == [0, 20, 40, 60]
+
+def test_multiscale_image_extract():
+    array = np.random.random((64, 64, 64)).astype(np.float32)
+    levels = [array, array[::2, ::2, ::2], array[::4, ::4, ::4]]
+    multiscale = MultiscaleImage(levels, spacing=(1.0, 1.0, 1.0))
+    assert multiscale.level_factors == [[1, 1, 1], [2, 2, 2], [4, 4, 4]]
+    region = multiscale.GetLargestPossibleRegion()
+
+    statistics = multiscale.statistics()
+    assert statistics == {'min': [float(levels[2].min())],
+                          'max': [float(levels[2].max())]}
+
+    image = multiscale.extract(region, [4, 4, 4])
+    assert np.array_equal(itk.array_view_from_image(image), levels[2])
+    assert np.allclose(image.GetSpacing(), (4.0, 4.0, 4.0))
+
+    # The coarsest level whose factors divide the scale factors is shrunk
+    image = multiscale.extract(region, [8, 8, 8])
+    assert tuple(image.GetLargestPossibleRegion().GetSize()) == (8, 8, 8)
+    assert np.allclose(image.GetSpacing(), (8.0, 8.0, 8.0))
+    image = multiscale.extract(region, [6, 6, 6])
+    assert tuple(image.GetLargestPossibleRegion().GetSize()) == (10, 10, 10)
+    assert np.allclose(image.GetSpacing(), (6.0, 6.0, 6.0))
+    # Scale factors that no level divides are read from full resolution
+    image = multiscale.extract(region, [3, 3, 3])
+    assert tuple(image.GetLargestPossibleRegion().GetSize()) == (21, 21, 21)
+    assert np.allclose(image.GetSpacing(), (3.0, 3.0, 3.0))
+
+    region.SetIndex((8, 8, 8))
+    region.SetSize((16, 16, 16))
+    image = multiscale.extract(region, [1, 1, 1])
+    assert np.array_equal(itk.array_view_from_image(image),
+                          array[8:24, 8:24, 8:24])
+
+
+def test_ome_zarr_multiscale():
+    zarr = pytest.importorskip("zarr")
+    array = np.random.randint(0, 255, size=(1, 32, 32, 32), dtype=np.uint8)
+    group = zarr.group()
+    group.create_dataset('0', data=array)
+    group.create_dataset('1', data=array[:, ::2, ::2, ::2])
+    group.attrs['multiscales'] = [{
+        'version': '0.4',
+        'axes': [{'name': 'c', 'type': 'channel'},
+                 {'name': 'z', 'type': 'space'},
+                 {'name': 'y', 'type': 'space'},
+                 {'name': 'x', 'type': 'space'}],
+        'datasets': [
+            {'path': '0', 'coordinateTransformations': [
+                {'type': 'scale', 'scale': [1.0, 3.0, 2.0, 1.0]}]},
+            {'path': '1', 'coordinateTransformations': [
+                {'type': 'scale', 'scale': [1.0, 6.0, 4.0, 2.0]}]}]}]
+    multiscale = to_lazy_image(group)
+    assert tuple(multiscale.GetLargestPossibleRegion().GetSize()) == (32, 32, 32)
+    assert np.allclose(multiscale.GetSpacing(), (1.0, 2.0, 3.0))
+    image = multiscale.extract(multiscale.GetLargestPossibleRegion(), [2, 2, 2])
+    assert np.array_equal(itk.array_view_from_image(image),
+                          array[0, ::2, ::2, ::2])
+
+
+class _Group(dict):
+    """The datasets and attributes of a zarr group."""
+
+    def __init__(self, datasets, multiscales):
+        super(_Group, self).__init__(datasets)
+        self.attrs = {'multiscales': [multiscales]}
+
+
+def test_ome_zarr_multiscale_without_axes():
+    # Versions 0.1 and 0.2 are TCZYX
+    array = np.random.randint(0, 255, size=(2, 3, 8, 16, 32), dtype=np.uint8)
+    group = _Group({'0': array, '1': array[..., ::2, ::2, ::2]},
+                   {'version': '0.2',
+                    'datasets': [{'path': '0'}, {'path': '1'}]})
+    multiscale = _ome_zarr_multiscale(group)
+    assert tuple(multiscale.GetLargestPossibleRegion().GetSize()) == (32, 16, 8)
+    image = multiscale.extract(multiscale.GetLargestPossibleRegion(), [1, 1, 1])
+    assert np.array_equal(itk.array_view_from_image(image), array[0, 0])
+
+
+def test_ome_zarr_multiscale_transformations():
+    array = np.random.randint(0, 255, size=(8, 16, 32), dtype=np.uint8)
+    group = _Group({'0': array, '1': array[::2, ::2, ::2]}, {
+        'version': '0.4',
+        'axes': [{'name': 'z', 'type': 'space'},
+                 {'name': 'y', 'type': 'space'},
+                 {'name': 'x', 'type': 'space'}],
+        'datasets': [
+            {'path': '0', 'coordinateTransformations': [
+                {'type': 'scale', 'scale': [3.0, 2.0, 1.0]},
+                {'type': 'translation', 'translation': [1.0, 1.0, 1.0]}]},
+            {'path': '1', 'coordinateTransformations': [
+                {'type': 'scale', 'scale': [6.0, 4.0, 2.0]}]}],
+        'coordinateTransformations': [
+            {'type': 'scale', 'scale': [2.0, 2.0, 2.0]},
+            {'type': 'translation', 'translation': [0.0, 5.0, 10.0]}]})
+    multiscale = _ome_zarr_multiscale(group)
+    assert np.allclose(multiscale.GetSpacing(), (2.0, 4.0, 6.0))
+    assert np.allclose(multiscale.GetOrigin(), (12.0, 7.0, 2.0))
@@ -0,0 +1,122 @@
+import asyncio
+import gc
+
+from itkwidgets import _scheduler
+from itkwidgets._scheduler import UpdateScheduler
+
+
+class Widget(object):
+    pass
+
+
+def test_update_scheduler_without_loop():
+    updates = []
+    widget = Widget()
+    scheduler = UpdateScheduler(widget, updates.append)
+    scheduler.request()
+    scheduler.request()
+    assert updates == [widget, widget]
+
+
+class Loop(object):
+    """An event loop driven by a fake clock."""
+
+    class Handle(object):
+        def __init__(self, when, callback):
+            self.when = when
+            self.callback = callback
+            self.cancelled = False
+
+        def cancel(self):
+            self.cancelled = True
+
+    def __init__(self):
+        self.now = 0.0
+        self.handles = []
+
+    def time(self):
+        return self.now
+
+    def call_later(self, delay, callback):
+        handle = Loop.Handle(self.now + delay, callback)
+        self.handles.append(handle)
+        return handle
+
+    def call_soon(self, callback):
+        return self.call_later(0.0, callback)
+
+    def advance(self, seconds):
+        """Run the callbacks that are due within the given seconds."""
+        end = self.now + seconds
+        while True:
+            due = [handle for handle in self.handles
+                   if handle.when <= end and not handle.cancelled]
+            if not due:
+                break
+            handle = min(due, key=lambda h: h.when)
+            self.handles.remove(handle)
+            self.now = max(self.now, handle.when)
+            handle.callback()
+        self.now = end
+
+
+def test_update_scheduler_throttle(monkeypatch):
+    loop = Loop()
+    monkeypatch.setattr(_scheduler, 'running_loop', lambda: loop)
+    updates = []
+    widget = Widget()
+    scheduler = UpdateScheduler(widget, lambda w: updates.append(loop.time()),
+                                interval=0.05)
+
+    for _ in range(20):
+        scheduler.request()
+        scheduler.request()
+        loop.advance(0.005)
+    loop.advance(0.1)
+
+    # Leading edge
+    assert updates[0] == 0.0
+    # Coalesced and throttled, with a trailing update
+    assert len(updates) == 3
+    assert all(b - a >= 0.05 - 1e-9 for a, b in zip(updates, updates[1:]))
+    assert updates[-1] >= 0.095
+    assert not scheduler.pending
+
+
+def test_update_scheduler_acknowledgement():
+    loop = asyncio.new_event_loop()
+    updates = []
+    widget = Widget()
+    scheduler = UpdateScheduler(widget, updates.append, interval=0.0,
+                                acknowledged=True)
+
+    async def interact():
+        scheduler.request()
+        await asyncio.sleep(0.01)
+        scheduler.request()
+        scheduler.request()
+        await asyncio.sleep(0.01)
+        assert len(updates) == 1
+        scheduler.acknowledge()
+        await asyncio.sleep(0.01)
+    loop.run_until_complete(interact())
+    loop.close()
+    assert len(updates) == 2
+
+
+def test_update_scheduler_closed_widget():
+    loop = asyncio.new_event_loop()
+    updates = []
+    widget = Widget()
+    scheduler = UpdateScheduler(widget, updates.append, interval=0.0)
+
+    async def interact():
+        scheduler.request()
+        await asyncio.sleep(0.01)
+    del widget
+    gc.collect()
+    loop.run_until_complete(interact())
+    loop.close()
+    assert updates == []
+    scheduler.request()
+    assert not scheduler.pending
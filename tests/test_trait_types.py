@@ -2,6 +2,7 @@ import itk
 import itkwidgets.trait_types as trait_types
 import numpy as np
 
+from itkwidgets import _compression
 from itkwidgets._transform_types import to_point_set
 
 
@@ -124,3 +125,260 @@ def test_polydata_list_from_json():
     assert(polydata_1['points']['dataType'] == 'Float32Array')
     assert(np.array_equal(polydata_1['points']['values'],
                           point_set_array_1.astype(np.float32)))
+
+
+def test_itkimage_json_chunked():
+    # Larger than the compression chunk size
+    array = np.random.random((64, 128, 520)).astype(np.float32)
+    image = itk.image_view_from_array(array)
+    asjson = trait_types.itkimage_to_json(image)
+    assert(isinstance(asjson['compressedData'], list))
+    assert(len(asjson['compressedData']) == 5)
+    assert(asjson['chunkSize'] == 4 * 1024 * 1024)
+    asimage = trait_types.itkimage_from_json(asjson)
+    assert(np.array_equal(itk.array_view_from_image(asimage), array))
+
+
+def test_itkimage_json_raw():
+    from itkwidgets._compression import AdaptiveLevel
+
+    class Manager(object):
+        compression_level = 'auto'
+        _adaptive_compression = AdaptiveLevel()
+    manager = Manager()
+    # Fast enough that compression does not pay off
+    manager._adaptive_compression.bandwidth = 1.0e15
+
+    array = np.random.random((16, 128, 128)).astype(np.float32)
+    image = itk.image_view_from_array(array)
+    asjson = trait_types.itkimage_to_json(image, manager)
+    assert(asjson['compression'] == 'raw')
+    # The browser reports its statistics with the sequence number
+    assert(asjson['sequence'] in manager._adaptive_compression._sent)
+    assert(asjson['compressedData'].nbytes == array.nbytes)
+    asimage = trait_types.itkimage_from_json(asjson)
+    assert(np.array_equal(itk.array_view_from_image(asimage), array))
+
+
+def test_itkimage_to_json_cache():
+    array = np.random.random((8, 8, 8)).astype(np.float32)
+    image = itk.image_view_from_array(array)
+    trait = trait_types.ITKImage()
+    asjson = trait_types.itkimage_to_json(trait.validate(None, image))
+    # The same, unmodified pixel buffer is not compressed again
+    assert(trait_types.itkimage_to_json(trait.validate(None, image)) is asjson)
+    image.Modified()
+    modified = trait_types.itkimage_to_json(trait.validate(None, image))
+    assert(modified is not asjson)
+    # Edits without Modified() are found by the sampled digest
+    array[4, 4, 4] += 1.0
+    assert(trait_types.itkimage_to_json(trait.validate(None, image)) is not modified)
+
+
+def test_itkimage_to_json_narrow_integer_types():
+    class Manager(object):
+        narrow_integer_types = True
+    manager = Manager()
+
+    array = np.zeros((4, 5, 6), dtype=np.int32)
+    array[1, 2, 3] = 200
+    image = itk.image_view_from_array(array)
+    asjson = trait_types.itkimage_to_json(image, manager)
+    assert(asjson['imageType']['componentType'] == 'uint8_t')
+    asimage = trait_types.itkimage_from_json(asjson)
+    assert(np.array_equal(itk.array_view_from_image(asimage), array))
+
+    array[0, 0, 0] = -300
+    image = itk.image_view_from_array(array)
+    asjson = trait_types.itkimage_to_json(image, manager)
+    assert(asjson['imageType']['componentType'] == 'int16_t')
+
+    # Not narrowed by default
+    array = np.zeros((4, 5, 6), dtype=np.uint32)
+    image = itk.image_view_from_array(array)
+    asjson = trait_types.itkimage_to_json(image)
+    assert(asjson['imageType']['componentType'] == 'uint32_t')
+
+
+def test_itkimage_json_shuffle():
+    class Manager(object):
+        compression_shuffle = 'byte'
+    manager = Manager()
+
+    # Smooth data
+    random = np.random.RandomState(0)
+    array = np.cumsum(random.normal(size=(64, 128, 520)), axis=2)
+    array = array.astype(np.float32)
+    image = itk.image_view_from_array(array)
+    plain = trait_types.itkimage_to_json(image)
+    for shuffle in ('byte', 'bit'):
+        manager.compression_shuffle = shuffle
+        asjson = trait_types.itkimage_to_json(image, manager)
+        assert(asjson['shuffle'] == shuffle)
+        assert(len(asjson['compressedData']) == 5)
+        asimage = trait_types.itkimage_from_json(asjson)
+        assert(np.array_equal(itk.array_view_from_image(asimage), array))
+    manager.compression_shuffle = 'byte'
+    asjson = trait_types.itkimage_to_json(image, manager)
+    assert(_compression.compressed_size(asjson['compressedData']) <
+           _compression.compressed_size(plain['compressedData']))
+
+
+def test_itkimage_to_json_statistics():
+    random = np.random.RandomState(0)
+    array = random.randint(0, 1000, size=(16, 32, 40, 3)).astype(np.uint16)
+    image = itk.image_view_from_array(array, is_vector=True)
+    asjson = trait_types.itkimage_to_json(image)
+    statistics = asjson['statistics']
+    assert(statistics['min'] == [float(m) for m in array.reshape(-1, 3).min(axis=0)])
+    assert(statistics['max'] == [float(m) for m in array.reshape(-1, 3).max(axis=0)])
+
+    # Statistics of the full resolution image are passed through
+    image = itk.image_view_from_array(array[..., 0].copy())
+    image._statistics = {'min': [0.0], 'max': [2000.0]}
+    graft = trait_types.ITKImage().validate(None, image)
+    asjson = trait_types.itkimage_to_json(graft)
+    assert(asjson['statistics']['max'] == [2000.0])
+
+    # Label maps are sent without statistics
+    asjson = trait_types.itklabelimage_to_json(image)
+    assert('statistics' not in asjson)
+
+    # Only finite values are in the range
+    array = np.linspace(-1.0, 1.0, 64, dtype=np.float32).reshape((8, 8))
+    array[0, 0] = np.inf
+    array[1, 1] = -np.inf
+    array[2, 2] = np.nan
+    asjson = trait_types.itkimage_to_json(itk.image_view_from_array(array))
+    finite = array[np.isfinite(array)]
+    assert(asjson['statistics'] == {'min': [float(finite.min())],
+                                    'max': [float(finite.max())]})
+    array[:] = np.nan
+    asjson = trait_types.itkimage_to_json(itk.image_view_from_array(array))
+    assert('statistics' not in asjson)
+
+
+def test_polydata_list_json_parallel():
+    polydata_list = []
+    for index in range(32):
+        point_set_array = np.random.multivariate_normal(gaussian_1_mean,
+                                                        gaussian_1_cov,
+                                                        index + 1)
+        polydata_list.append(to_point_set(point_set_array))
+    # Larger than the compression chunk size
+    polydata_list.append(to_point_set(np.random.random((400000, 3))))
+
+    asjson = trait_types.polydata_list_to_json(polydata_list)
+    assert(isinstance(asjson[-1]['points']['compressedValues'], list))
+    assert(asjson[-1]['points']['chunkSize'] == 4 * 1024 * 1024)
+    polydata_list_from_json = trait_types.polydata_list_from_json(asjson)
+    for polydata, from_json in zip(polydata_list, polydata_list_from_json):
+        assert(np.array_equal(from_json['points']['values'],
+                              polydata['points']['values']))
+
+
+def test_polydata_list_to_json_incremental():
+    polydata_list = [to_point_set(np.random.random((10, 3)))
+                     for index in range(3)]
+
+    class Manager(object):
+        _synced_fingerprints = dict()
+        point_sets = polydata_list
+    manager = Manager()
+    serialization = trait_types.incremental_polydata_list_serialization(
+        'point_sets')
+    to_json = serialization['to_json']
+    from_json = serialization['from_json']
+
+    asjson = to_json(polydata_list, manager)
+    assert(all('points' in polydata for polydata in asjson))
+    fingerprints = [polydata['fingerprint'] for polydata in asjson]
+    assert(len(set(fingerprints)) == 3)
+
+    # Only the modified entry is sent
+    polydata_list[1]['points']['values'][0, 0] += 1.0
+    asjson = to_json(polydata_list, manager)
+    assert(asjson[0] == {'fingerprint': fingerprints[0]})
+    assert('points' in asjson[1])
+    assert(asjson[1]['fingerprint'] != fingerprints[1])
+    assert(asjson[2] == {'fingerprint': fingerprints[2]})
+
+    polydata_list_from_json = from_json(asjson, manager)
+    for polydata, from_json in zip(polydata_list, polydata_list_from_json):
+        assert(np.array_equal(from_json['points']['values'],
+                              polydata['points']['values']))
+
+    # A front-end without state receives all the entries
+    manager._synced_fingerprints.clear()
+    asjson = to_json(polydata_list, manager)
+    assert(all('points' in polydata for polydata in asjson))
+
+
+def test_polydata_list_json_quantized_points():
+    point_set_array = np.random.random((1000, 3)) * 100.0
+    polydata_list = [to_point_set(point_set_array)]
+    serialization = trait_types.incremental_polydata_list_serialization(
+        'point_sets')
+
+    class Manager(object):
+        point_set_quantization_error = 0.001
+    manager = Manager()
+
+    asjson = serialization['to_json'](polydata_list, manager)
+    points = asjson[0]['points']
+    assert(points['dataType'] == 'Float32Array')
+    assert(points['encodedDataType'] == 'Uint16Array')
+    assert(len(points['quantization']['scale']) == 3)
+    polydata_list_from_json = serialization['from_json'](asjson, manager)
+    from_json = polydata_list_from_json[0]['points']
+    assert(from_json['values'].dtype == np.float32)
+    assert(np.abs(from_json['values'] - point_set_array).max() < 0.001)
+    assert('quantization' not in from_json)
+
+    # The error bound cannot be met
+    manager.point_set_quantization_error = 1e-5
+    asjson = serialization['to_json'](polydata_list, manager)
+    assert('encodedDataType' not in asjson[0]['points'])
+
+
+def test_encode_cells():
+    # Triangles
+    number_of_triangles = 1000
+    indices = np.random.randint(0, 100000, size=(number_of_triangles, 3))
+    values = np.hstack((3 * np.ones((number_of_triangles, 1)),
+                        indices)).astype(np.uint32).reshape(-1)
+    encoded, encodedDataType, cellSize = trait_types.encode_cells(values)
+    assert(encodedDataType == 'Uint32Array')
+    assert(cellSize == 3)
+    decoded = trait_types.decode_cells(encoded, np.uint32, cellSize)
+    assert(np.array_equal(decoded, values))
+
+    # Vertices, as created by to_point_set
+    values = to_point_set(np.random.random((10, 3)))['verts']['values']
+    encoded, encodedDataType, cellSize = trait_types.encode_cells(values)
+    assert(encodedDataType == 'Uint16Array')
+    decoded = trait_types.decode_cells(encoded, np.uint32, cellSize)
+    assert(np.array_equal(decoded, values))
+
+    # Mixed cell sizes
+    values = np.array([3, 0, 1, 2, 4, 2, 3, 4, 5], dtype=np.uint32)
+    encoded, encodedDataType, cellSize = trait_types.encode_cells(values)
+    assert(encodedDataType == 'Uint16Array')
+    assert(cellSize is None)
+    decoded = trait_types.decode_cells(encoded, np.uint32, cellSize)
+    assert(np.array_equal(decoded, values))
+
+
+def test_polydata_list_json_compact_cells():
+    class Manager(object):
+        compact_cells = True
+    manager = Manager()
+    polydata_list = [to_point_set(np.random.random((100, 3)))]
+    asjson = trait_types.polydata_list_to_json(polydata_list, manager)
+    assert(asjson[0]['verts']['encodedDataType'] == 'Uint16Array')
+    assert(asjson[0]['verts']['dataType'] == 'Uint32Array')
+    polydata_list_from_json = trait_types.polydata_list_from_json(asjson)
+    verts = polydata_list_from_json[0]['verts']
+    assert(verts['values'].dtype == np.uint32)
+    assert(np.array_equal(verts['values'],
+                          polydata_list[0]['verts']['values']))
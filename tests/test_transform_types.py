@@ -279,3 +279,36 @@ def test_non_contiguous_array():
     data = data[..., 0]   # slicing the array makes it non-contiguous
     output = to_itk_image(data)
     assert isinstance(output, itk.Image)
+
+
+def test_lazy_image_to_itk_image(tmpdir):
+    from itkwidgets.widget_line_profiler import LineProfiler
+
+    path = str(tmpdir.join('image.npy'))
+    array = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                      shape=(64, 64))
+    array[:] = np.arange(64, dtype=np.float32)
+    profiler = LineProfiler(image=array, order=1,
+                            point1=[0.0, 0.0, 0.0], point2=[63.0, 0.0, 0.0])
+    output = to_itk_image(profiler.image)
+    assert isinstance(output, itk.Image)
+    assert np.array_equal(itk.array_view_from_image(output), array)
+    distances, intensities = profiler.get_profile()
+    assert np.isclose(intensities[0], 0.0)
+    assert np.isclose(intensities[-1], 63.0)
+
+
+def test_dask_image_to_itk_image():
+    dask_array = pytest.importorskip('dask.array')
+    from itkwidgets.widget_line_profiler import LineProfiler
+
+    array = np.tile(np.arange(64, dtype=np.float32), (64, 1))
+    profiler = LineProfiler(image=dask_array.from_array(array, chunks=16),
+                            order=1,
+                            point1=[0.0, 0.0, 0.0], point2=[63.0, 0.0, 0.0])
+    output = to_itk_image(profiler.image)
+    assert isinstance(output, itk.Image)
+    assert np.array_equal(itk.array_view_from_image(output), array)
+    distances, intensities = profiler.get_profile()
+    assert np.isclose(intensities[0], 0.0)
+    assert np.isclose(intensities[-1], 63.0)
@@ -0,0 +1,308 @@
+import threading
+
+import itk
+import numpy as np
+import pytest
+from traitlets import TraitError
+
+from itkwidgets import widget_viewer
+from itkwidgets.trait_types import itkimage_to_json
+from itkwidgets.widget_viewer import Viewer
+
+
+def test_progressive():
+    array = np.random.random((2048, 2048)).astype(np.float32)
+    viewer = Viewer(image=array, progressive=True)
+    assert(viewer._downsampling)
+    # The initial render does not send a preview
+    assert(not getattr(viewer.rendered_image, '_preview', False))
+    # Previews are read from the pyramid
+    viewer._pyramids['image'][1].result()
+
+    sizes = []
+
+    def on_rendered_image(change):
+        sizes.append(tuple(change.new.GetBufferedRegion().GetSize()))
+    viewer.observe(on_rendered_image, ['rendered_image'])
+    viewer._rendering_image = False
+    viewer._update_rendered_image()
+    assert(sizes == [(256, 256), (1024, 1024)])
+
+    viewer.progressive = False
+    sizes = []
+    viewer._rendering_image = False
+    viewer._update_rendered_image()
+    assert(sizes == [(1024, 1024)])
+
+
+def test_progressive_background(monkeypatch):
+    array = np.random.random((2048, 2048)).astype(np.float32)
+    viewer = Viewer(image=array, progressive=True)
+    viewer._pyramids['image'][1].result()
+
+    callbacks = []
+
+    class Loop(object):
+        def call_soon_threadsafe(self, callback, *args):
+            callbacks.append((callback, args))
+    monkeypatch.setattr(widget_viewer, 'running_loop', lambda: Loop())
+
+    threads = []
+    progressive_preview = viewer._progressive_preview
+
+    def preview(label, region, scale_factors):
+        threads.append(threading.current_thread())
+        return progressive_preview(label, region, scale_factors)
+    monkeypatch.setattr(viewer, '_progressive_preview', preview)
+
+    rendered = []
+
+    def on_rendered_image(change):
+        rendered.append(change.new)
+    viewer.observe(on_rendered_image, ['rendered_image'])
+    viewer._rendering_image = False
+    viewer.roi = np.array([[0., 0., 0.], [1536., 1536., 0.]])
+    widget_viewer.get_render_executor().submit(lambda: None).result()
+    # The preview is assigned in its own callback, before the full resolution
+    # image
+    assert(len(callbacks) == 2)
+    callback, args = callbacks[0]
+    callback(*args)
+    assert(len(rendered) == 1)
+    callback, args = callbacks[1]
+    callback(*args)
+    # The preview is computed before the render, off the event loop thread
+    assert(threads and threading.current_thread() not in threads)
+    sizes = [tuple(image.GetBufferedRegion().GetSize()) for image in rendered]
+    assert(sizes == [(256, 256), (768, 768)])
+    # Only the full resolution image is acknowledged by the browser
+    assert(itkimage_to_json(rendered[0])['preview'])
+    assert('preview' not in itkimage_to_json(rendered[1]))
+    assert(viewer._rendering_image)
+
+
+def test_pyramid():
+    array = np.random.random((2048, 2048)).astype(np.float32)
+    viewer = Viewer(image=array)
+    viewer._pyramids['image'][1].result()
+
+    viewer.roi = np.array([[0., 0., 0.], [1536., 1536., 0.]])
+    viewer._rendering_image = False
+    viewer._update_rendered_image()
+    rendered = itk.array_view_from_image(viewer.rendered_image)
+    expected = array[:1536, :1536].reshape((768, 2, 768, 2)).mean(axis=(1, 3))
+    assert(np.allclose(rendered, expected, atol=1e-5))
+
+
+
+def test_multiscale_scale_factors():
+    from itkwidgets._lazy_image import MultiscaleImage
+    array = np.random.random((3000, 3000)).astype(np.float32)
+    viewer = Viewer(image=MultiscaleImage([array, array[::2, ::2],
+                                           array[::4, ::4]]))
+    # No level divides a scale factor of 3
+    assert(list(viewer._scale_factors[:2]) == [3, 3])
+    size = viewer.rendered_image.GetLargestPossibleRegion().GetSize()
+    assert(tuple(size) == (1000, 1000))
+    assert(np.allclose(viewer.rendered_image.GetSpacing(), (3.0, 3.0)))
+
+def test_roi_cache():
+    array = np.random.random((2048, 2048)).astype(np.float32)
+    viewer = Viewer(image=array)
+    info = viewer.roi_cache_info()
+    assert(info['misses'] == 1 and info['entries'] == 1)
+
+    rois = [np.array([[0., 0., 0.], [1536., 1536., 0.]]),
+            np.array([[512., 512., 0.], [2047., 2047., 0.]])]
+    rendered = []
+    for roi in rois + rois:
+        viewer._rendering_image = False
+        viewer.roi = roi
+        rendered.append(viewer.rendered_image)
+    info = viewer.roi_cache_info()
+    assert(info['misses'] == 3 and info['hits'] == 2)
+    assert(info['nbytes'] == sum(itk.array_view_from_image(image).nbytes
+                                 for image in rendered[:2]) + 1024 * 1024 * 4)
+    assert(np.array_equal(itk.array_view_from_image(rendered[0]),
+                          itk.array_view_from_image(rendered[2])))
+
+    viewer.roi_cache_size = 0
+    assert(viewer.roi_cache_info()['entries'] == 0)
+
+
+def test_background_render(monkeypatch):
+    array = np.random.random((2048, 2048)).astype(np.float32)
+    viewer = Viewer(image=array)
+
+    callbacks = []
+
+    class Loop(object):
+        def call_soon_threadsafe(self, callback, *args):
+            callbacks.append((callback, args))
+    monkeypatch.setattr(widget_viewer, 'running_loop', lambda: Loop())
+
+    rois = [np.array([[0., 0., 0.], [1536., 1536., 0.]]),
+            np.array([[512., 512., 0.], [1024., 1024., 0.]])]
+    for roi in rois:
+        viewer._rendering_image = False
+        viewer.roi = roi
+    # Wait for the renders
+    widget_viewer.get_render_executor().submit(lambda: None).result()
+    assert(tuple(viewer.rendered_image.GetBufferedRegion().GetSize()) == (1024, 1024))
+    for callback, args in callbacks:
+        callback(*args)
+    assert(np.allclose(viewer.rendered_image.GetOrigin(), (512., 512.)))
+    assert(tuple(viewer.rendered_image.GetBufferedRegion().GetSize()) == (514, 514))
+
+
+def test_rendered_image_statistics():
+    array = np.random.random((2048, 2048)).astype(np.float32)
+    array[0, 0] = 2.0
+    viewer = Viewer(image=array)
+    asjson = itkimage_to_json(viewer.rendered_image)
+    assert(asjson['statistics']['max'] == [2.0])
+
+
+def test_label_inventory():
+    labels = np.zeros((64, 64), dtype=np.uint8)
+    labels[10:20, 30:40] = 1
+    labels[50, 5] = 7
+    viewer = Viewer(label_image=labels)
+    inventory = viewer.label_inventory()
+    assert(list(inventory.labels) == [0, 1, 7])
+    assert(list(inventory.counts) == [64 * 64 - 101, 100, 1])
+    assert(inventory.bounding_boxes[1].tolist() == [[30, 10], [39, 19]])
+    assert(inventory.bounding_boxes[2].tolist() == [[5, 50], [5, 50]])
+
+    viewer.label_image_weights = [1.0, 0.5, 0.2]
+    viewer.label_image_weights = [1.0, 0.5, 0.5]
+    info = viewer._label_inventories.info()
+    assert(info['misses'] == 2 and info['hits'] == 1)
+    with pytest.raises(TraitError):
+        viewer.label_image_weights = [1.0, 0.5]
+
+
+def test_size_limit_bytes():
+    budget = 64 * 128 * 128
+    sizes = []
+    for dtype in (np.uint8, np.float64):
+        array = np.zeros((64, 512, 512), dtype=dtype)
+        image = itk.image_view_from_array(array)
+        image.SetSpacing((1.0, 1.0, 4.0))
+        viewer = Viewer(image=image, size_limit_bytes=budget)
+        assert(viewer._downsampling)
+        rendered = viewer.rendered_image
+        size = tuple(rendered.GetBufferedRegion().GetSize())
+        assert(np.prod(size) * array.itemsize <= budget)
+        sizes.append(size)
+    # Anisotropic factors make the resolution isotropic first
+    assert(sizes[0] == (128, 128, 64))
+    assert(np.prod(sizes[1]) < np.prod(sizes[0]))
+
+    # Components are accounted for
+    array = np.zeros((512, 512, 3), dtype=np.uint16)
+    image = itk.image_view_from_array(array, is_vector=True)
+    assert(Viewer._pixel_bytes(image) == 6)
+
+    # The coarsest pyramid level is the rendered size
+    array = np.zeros((64, 512, 512), dtype=np.uint8)
+    image = itk.image_view_from_array(array)
+    image.SetSpacing((1.0, 1.0, 4.0))
+    viewer = Viewer(image=image, size_limit_bytes=budget // 8)
+    pyramid = viewer._pyramids['image'][1].result()
+    assert(np.prod(pyramid.levels[-1].shape) <= budget // 8)
+
+
+def test_slice_streaming():
+    array = np.random.random((64, 300, 300)).astype(np.float32)
+    viewer = Viewer(image=array, mode='z', z_slice=10.0, slice_streaming=True)
+    assert(viewer._downsampling)
+    rendered = viewer.rendered_image
+    assert(tuple(rendered.GetBufferedRegion().GetSize()) == (300, 300, 1))
+    assert(rendered.GetOrigin()[2] == 10.0)
+    assert(np.array_equal(itk.array_view_from_image(rendered)[0], array[10]))
+    # The slider of the browser spans the volume
+    assert(viewer._streamed_slice == {'index': 10, 'size': 64,
+                                      'positions': [0.0, 63.0]})
+    # The neighbouring slices are prefetched
+    assert(viewer.roi_cache_info()['misses'] == 1 + 2 * viewer.slice_prefetch)
+
+    viewer._rendering_image = False
+    viewer.z_slice = 11.0
+    # Only slice 13 is not prefetched yet
+    info = viewer.roi_cache_info()
+    assert(info['hits'] == 4 and info['misses'] == 6)
+    rendered = viewer.rendered_image
+    assert(np.array_equal(itk.array_view_from_image(rendered)[0], array[11]))
+
+    viewer._rendering_image = False
+    viewer.mode = 'v'
+    size = tuple(viewer.rendered_image.GetBufferedRegion().GetSize())
+    assert(size == (150, 150, 64))
+    assert(viewer._streamed_slice is None)
+
+
+def test_largest_roi_origin():
+    array = np.random.random((2048, 2048)).astype(np.float32)
+    viewer = Viewer(image=array)
+    largest_roi = viewer.roi.copy()
+    roi = largest_roi.copy()
+    roi[0][:2] = 0.4
+    viewer._rendering_image = False
+    viewer.roi = roi
+    assert(np.allclose(viewer.rendered_image.GetOrigin(), (0.4, 0.4)))
+    viewer._rendering_image = False
+    viewer.roi = largest_roi
+    assert(np.allclose(viewer.rendered_image.GetOrigin(), (0.0, 0.0)))
+
+
+def test_replace_lazy_image(tmpdir, monkeypatch):
+    path = str(tmpdir.join('image.npy'))
+    array = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32,
+                                      shape=(2048, 2048))
+    array[:] = 1.0
+    viewer = Viewer(image=array)
+    assert(viewer._downsampling)
+
+    # Render with the ITK filters rather than the pyramid
+    monkeypatch.setattr(viewer, '_pyramid', lambda label: None)
+    replacement = np.random.random((2048, 2048)).astype(np.float32)
+    viewer._rendering_image = False
+    viewer.image = replacement
+    rendered = itk.array_view_from_image(viewer.rendered_image)
+    expected = replacement.reshape((1024, 2, 1024, 2)).mean(axis=(1, 3))
+    assert(np.allclose(rendered, expected, atol=1e-5))
+
+
+def test_failed_render(monkeypatch):
+    callbacks = []
+
+    class Loop(object):
+        def call_soon_threadsafe(self, callback, *args):
+            callbacks.append((callback, args))
+    monkeypatch.setattr(widget_viewer, 'running_loop', lambda: Loop())
+
+    # The first image is rendered before the viewer is returned
+    array = np.random.random((2048, 2048)).astype(np.float32)
+    viewer = Viewer(image=array)
+    assert(viewer.rendered_image is not None)
+
+    def failing_render(*args):
+        raise RuntimeError('Render failed')
+    monkeypatch.setattr(viewer, '_render', failing_render)
+    viewer._rendering_image = False
+    viewer.roi = np.array([[0., 0., 0.], [1536., 1536., 0.]])
+    assert(viewer._rendering_image)
+    widget_viewer.get_render_executor().submit(lambda: None).result()
+    for callback, args in callbacks:
+        callback(*args)
+    assert(not viewer._rendering_image)
+
+
+def test_render_acknowledgement():
+    array = np.random.random((64, 64)).astype(np.float32)
+    viewer = Viewer(image=array)
+    # Renders are not held back waiting for a view that does not exist
+    assert(not viewer._render_scheduler.acknowledged)
+    viewer._repr_mimebundle_()
+    assert(viewer._render_scheduler.acknowledged)